@@ -1,13 +1,34 @@
 """
 OneBot API 封装模块
 """
-from typing import Any, Dict, List, Optional
-import requests
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import aiohttp
 from src.utils.logger import get_logger
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - 可选依赖
+    ijson = None
+
 logger = get_logger(__name__)
 
 
+def _copy_result(data: Any) -> Any:
+    """
+    复制缓存的 API 结果
+    
+    OneBot 返回的群/成员信息是字典或字典列表，字段值均为标量，
+    复制到字典这一层即可与缓存隔离，无需 deepcopy。
+    """
+    if isinstance(data, list):
+        return [dict(item) if isinstance(item, dict) else item for item in data]
+    if isinstance(data, dict):
+        return dict(data)
+    return data
+
+
 class OneBotAPI:
     """OneBot API 客户端"""
     
@@ -16,7 +37,8 @@ class OneBotAPI:
         host: str = "127.0.0.1",
         port: int = 5700,
         access_token: str = "",
-        timeout: int = 30
+        timeout: int = 30,
+        cache_ttl: float = 0
     ):
         """
         初始化 OneBot API 客户端
@@ -26,6 +48,8 @@ class OneBotAPI:
             port: OneBot 服务端口
             access_token: 访问令牌
             timeout: 请求超时时间
+            cache_ttl: 群列表/群信息/群成员列表的本地缓存时间(秒)，
+                默认 0 表示不缓存 (通常取自配置 advanced.cache)
         """
         self.base_url = f"http://{host}:{port}"
         self.access_token = access_token
@@ -35,8 +59,33 @@ class OneBotAPI:
         if access_token:
             self.headers["Authorization"] = f"Bearer {access_token}"
         
+        # 持久化 HTTP 会话，首次调用时创建（需要运行中的事件循环）
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # 本地 TTL 缓存与进行中的请求 (相同请求并发时只发起一次)
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        
         logger.info(f"OneBot API 客户端已初始化: {self.base_url}")
     
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取（或创建）复用连接的 HTTP 会话"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+            )
+        return self._session
+    
+    async def close(self):
+        """关闭 HTTP 会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
     async def _call_api(
         self,
         endpoint: str,
@@ -52,18 +101,12 @@ class OneBotAPI:
         Returns:
             API 响应数据
         """
-        url = f"{self.base_url}/{endpoint}"
+        session = self._get_session()
         
         try:
-            response = requests.post(
-                url,
-                json=params or {},
-                headers=self.headers,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+            async with session.post(f"/{endpoint}", json=params or {}) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
             
             if result.get("status") == "failed":
                 error_msg = result.get("msg", "Unknown error")
@@ -72,13 +115,62 @@ class OneBotAPI:
             
             return result.get("data", {})
             
-        except requests.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"HTTP 请求错误: {endpoint} - {str(e)}")
             raise
         except Exception as e:
             logger.error(f"API 调用异常: {endpoint} - {str(e)}")
             raise
     
+    async def _call_api_cached(
+        self,
+        endpoint: str,
+        params: Dict[str, Any]
+    ) -> Any:
+        """
+        带 TTL 缓存的 API 调用
+        
+        缓存未过期时直接返回；相同请求正在进行时等待其结果，
+        避免并发调用重复请求 OneBot。每个调用方拿到的都是缓存结果的副本，
+        修改返回值不会影响缓存及其他调用方。
+        """
+        key = (endpoint, tuple(sorted(params.items())))
+        
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return _copy_result(cached[1])
+        
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call_api(endpoint, params))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._on_call_done(key, f))
+        
+        # shield: 单个调用方被取消时不影响其他等待者
+        return _copy_result(await asyncio.shield(future))
+    
+    def _on_call_done(self, key: Tuple, future: asyncio.Future):
+        """请求完成后写入缓存"""
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._cache[key] = (time.monotonic(), future.result())
+    
+    def invalidate_cache(self, group_id: Optional[int] = None):
+        """
+        清除本地缓存
+        
+        Args:
+            group_id: 只清除该群的群信息/成员列表及群列表缓存，为 None 时清空全部
+        """
+        if group_id is None:
+            self._cache.clear()
+            return
+        
+        for key in list(self._cache):
+            endpoint, params = key
+            if endpoint == "get_group_list" or ("group_id", group_id) in params:
+                del self._cache[key]
+    
     # ==================== 群组相关 API ====================
     
     async def get_group_list(self, no_cache: bool = False) -> List[Dict[str, Any]]:
@@ -92,7 +184,10 @@ class OneBotAPI:
             群列表
         """
         logger.info("获取群列表")
-        return await self._call_api("get_group_list", {"no_cache": no_cache})
+        params = {"no_cache": no_cache}
+        if no_cache or self.cache_ttl <= 0:
+            return await self._call_api("get_group_list", params)
+        return await self._call_api_cached("get_group_list", params)
     
     async def get_group_info(
         self,
@@ -110,10 +205,10 @@ class OneBotAPI:
             群信息
         """
         logger.info(f"获取群信息: {group_id}")
-        return await self._call_api(
-            "get_group_info",
-            {"group_id": group_id, "no_cache": no_cache}
-        )
+        params = {"group_id": group_id, "no_cache": no_cache}
+        if no_cache or self.cache_ttl <= 0:
+            return await self._call_api("get_group_info", params)
+        return await self._call_api_cached("get_group_info", params)
     
     async def get_group_member_list(
         self,
@@ -131,10 +226,72 @@ class OneBotAPI:
             群成员列表
         """
         logger.info(f"获取群成员列表: {group_id}")
-        return await self._call_api(
-            "get_group_member_list",
-            {"group_id": group_id, "no_cache": no_cache}
-        )
+        params = {"group_id": group_id, "no_cache": no_cache}
+        if no_cache or self.cache_ttl <= 0:
+            return await self._call_api("get_group_member_list", params)
+        return await self._call_api_cached("get_group_member_list", params)
+    
+    async def iter_group_member_list(
+        self,
+        group_id: int,
+        no_cache: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式获取群成员列表 (不使用本地缓存)
+        
+        边接收响应边逐条解析 data 数组，适用于超大群。
+        未安装 ijson 时回退为一次性获取。
+        
+        Args:
+            group_id: 群号
+            no_cache: 是否要求 OneBot 实现不使用其缓存 (默认是，备份需要最新数据)
+            
+        Yields:
+            群成员信息
+        """
+        if ijson is None:
+            params = {"group_id": group_id, "no_cache": no_cache}
+            for member in await self._call_api("get_group_member_list", params):
+                yield member
+            return
+        
+        logger.info(f"流式获取群成员列表: {group_id}")
+        endpoint = "get_group_member_list"
+        session = self._get_session()
+        status, msg = None, None
+        
+        try:
+            async with session.post(
+                f"/{endpoint}",
+                json={"group_id": group_id, "no_cache": no_cache}
+            ) as response:
+                response.raise_for_status()
+                
+                # ijson 默认自动选用最快的可用后端 (yajl2_c)
+                builder = None
+                async for prefix, event, value in ijson.parse(
+                    response.content, use_float=True
+                ):
+                    if builder is not None:
+                        builder.event(event, value)
+                        if prefix == "data.item" and event == "end_map":
+                            yield builder.value
+                            builder = None
+                    elif prefix == "data.item" and event == "start_map":
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    elif prefix == "status":
+                        status = value
+                    elif prefix == "msg":
+                        msg = value
+            
+            if status == "failed":
+                logger.error(f"API 调用失败: {endpoint} - {msg or 'Unknown error'}")
+                raise Exception(f"API Error: {msg or 'Unknown error'}")
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"HTTP 请求错误: {endpoint} - {str(e)}")
+            raise
     
     async def get_group_member_info(
         self,
@@ -360,7 +517,8 @@ async def create_onebot_client(
     host: str = "127.0.0.1",
     port: int = 5700,
     access_token: str = "",
-    timeout: int = 30
+    timeout: int = 30,
+    cache_ttl: float = 0
 ) -> OneBotAPI:
-    """创建 OneBot 客户端"""
-    return OneBotAPI(host, port, access_token, timeout)
+    """创建 OneBot 客户端（使用完毕后需调用 close() 释放连接）"""
+    return OneBotAPI(host, port, access_token, timeout, cache_ttl)
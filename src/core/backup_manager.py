@@ -1,23 +1,58 @@
 """
 备份管理器 - 核心备份逻辑
 """
+import asyncio
+import hashlib
 import json
-import gzip
+import os
+from collections import Counter
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import select, delete
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from sqlalchemy import select, delete, insert, func, or_, Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.onebot import OneBotAPI
 from src.models import (
-    db_manager, Group, Member, MemberHistory,
+    db_manager, dialect_insert, Group, Member, MemberHistory,
     Backup, BackupMember, BackupType, BackupStatus
 )
 from src.utils.logger import get_logger
+from src.utils.serializer import json_dumps, json_loads
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - 可选依赖
+    ijson = None
+
+try:
+    # ISA-L 加速的 gzip 实现 (SIMD CRC32/deflate)，接口与标准库一致
+    from isal import igzip as gzip
+    GZIP_COMPRESS_LEVEL = 2  # isal 仅支持 0-3
+except ImportError:  # pragma: no cover - 可选依赖
+    import gzip
+    GZIP_COMPRESS_LEVEL = 6
+
+try:
+    # zstd 对重复键较多的成员 JSON 压缩率明显高于 gzip，速度相近
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+ZSTD_COMPRESS_LEVEL = 3
 
 logger = get_logger(__name__)
 
+# 增量备份中跟踪变化的成员字段
+INCREMENTAL_FIELDS = BackupMember.CONTENT_FIELDS
+
+# 流式接收成员时每批写入的快照行数
+MEMBER_INSERT_BATCH = 500
+
+# 流式读取备份文件时每次在线程池中解析的成员数
+BACKUP_READ_BATCH = 1000
+
 
 class BackupManager:
     """备份管理器"""
@@ -41,6 +76,13 @@ class BackupManager:
         self.client = client
         self.backup_dir = Path(backup_dir)
         self.compression = compression
+        # 压缩时优先使用 zstd，未安装 zstandard 时使用 gzip
+        if not compression:
+            self._file_suffix = ""
+        elif zstandard is not None:
+            self._file_suffix = ".zst"
+        else:
+            self._file_suffix = ".gz"
         self.encryption = encryption
         
         # 确保备份目录存在
@@ -48,12 +90,17 @@ class BackupManager:
         
         logger.info(f"备份管理器已初始化: {self.backup_dir}")
     
-    async def sync_group_info(self, group_id: int) -> Optional[Group]:
+    async def sync_group_info(
+        self,
+        group_id: int,
+        session: Optional[AsyncSession] = None
+    ) -> Optional[Group]:
         """
         同步群信息到数据库
         
         Args:
             group_id: 群号
+            session: 数据库会话，传入时复用该会话且不提交 (由调用方提交)
             
         Returns:
             群组对象
@@ -62,41 +109,56 @@ class BackupManager:
             # 从 OneBot 获取群信息
             group_info = await self.client.get_group_info(group_id, no_cache=True)
             
-            async with db_manager.get_async_session() as session:
-                # 查询现有群组
-                result = await session.execute(
-                    select(Group).where(Group.group_id == group_id)
-                )
-                group = result.scalar_one_or_none()
-                
-                if group:
-                    # 更新现有群组
-                    group.group_name = group_info.get("group_name", "")
-                    group.member_count = group_info.get("member_count", 0)
-                    group.max_member_count = group_info.get("max_member_count", 0)
-                    group.group_level = group_info.get("group_level", 0)
-                    group.updated_at = datetime.utcnow()
-                else:
-                    # 创建新群组
-                    group = Group(
-                        group_id=group_id,
-                        group_name=group_info.get("group_name", ""),
-                        member_count=group_info.get("member_count", 0),
-                        max_member_count=group_info.get("max_member_count", 0),
-                        group_level=group_info.get("group_level", 0),
-                    )
-                    session.add(group)
-                
-                await session.commit()
-                await session.refresh(group)
-                
-                logger.info(f"群信息已同步: {group.group_name}({group_id})")
-                return group
+            if session is None:
+                async with db_manager.get_async_session() as session:
+                    group = await self._save_group(session, group_id, group_info)
+                    await session.commit()
+            else:
+                group = await self._save_group(session, group_id, group_info)
+            
+            logger.info(f"群信息已同步: {group.group_name}({group_id})")
+            return group
                 
         except Exception as e:
             logger.error(f"同步群信息失败: {group_id} - {str(e)}")
             raise
     
+    async def _save_group(
+        self,
+        session: AsyncSession,
+        group_id: int,
+        group_info: Dict[str, Any],
+        **values: Any
+    ) -> Group:
+        """
+        将群信息写入数据库 (单条 UPSERT，新增或更新)
+        
+        Args:
+            session: 数据库会话
+            group_id: 群号
+            group_info: OneBot 返回的群信息
+            **values: 额外写入/覆盖的列 (如 last_backup_at)
+            
+        Returns:
+            群组对象
+        """
+        row = {
+            "group_name": group_info.get("group_name", ""),
+            "member_count": group_info.get("member_count", 0),
+            "max_member_count": group_info.get("max_member_count", 0),
+            "group_level": group_info.get("group_level", 0),
+            **values,
+        }
+        stmt = dialect_insert(session, Group).values(group_id=group_id, **row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["group_id"],
+            set_={**row, "updated_at": datetime.utcnow()},
+        ).returning(Group)
+        result = await session.scalars(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.one()
+    
     async def backup_group(
         self,
         group_id: int,
@@ -128,72 +190,81 @@ class BackupManager:
                 encrypted=self.encryption,
             )
             session.add(backup)
+            # 先提交，使失败时也能留下备份记录；
+            # 会话 expire_on_commit=False，提交后 backup.id 已可用，无需 refresh
             await session.commit()
-            await session.refresh(backup)
             
             try:
-                # 同步群信息
-                await self.sync_group_info(group_id)
-                
-                # 获取群成员列表
-                members_data = await self.client.get_group_member_list(group_id, no_cache=True)
+                # 并发获取群信息与流式接收群成员
+                # (边接收边写入备份快照；只有成员流任务使用当前会话)
+                members_task = asyncio.ensure_future(
+                    self._receive_members(session, backup.id, group_id)
+                )
+                try:
+                    group_info = await self.client.get_group_info(group_id, no_cache=True)
+                except BaseException:
+                    # 先停止成员流任务，确保之后不会再并发使用同一个会话
+                    members_task.cancel()
+                    await asyncio.gather(members_task, return_exceptions=True)
+                    raise
+                members_data = await members_task
                 logger.info(f"获取到 {len(members_data)} 个成员")
                 
                 # 获取当前数据库中的成员
                 old_members = await self._get_current_members(session, group_id)
-                old_user_ids = set(old_members.keys())
-                new_user_ids = set(m.get("user_id") for m in members_data)
+                by_id = {m.get("user_id"): m for m in members_data}
+                # dict 键视图本身支持集合运算，无需再构建 set
+                old_user_ids = old_members.keys()
+                new_user_ids = by_id.keys()
                 
                 # 计算变化
                 joined_ids = new_user_ids - old_user_ids
                 left_ids = old_user_ids - new_user_ids
                 
-                # 记录成员变化历史
-                for user_id in joined_ids:
-                    member_data = next(m for m in members_data if m.get("user_id") == user_id)
-                    history = MemberHistory(
-                        group_id=group_id,
-                        user_id=user_id,
-                        nickname=member_data.get("nickname", ""),
-                        action="join",
-                        backup_id=backup.id,
-                    )
-                    session.add(history)
-                
-                for user_id in left_ids:
-                    old_member = old_members[user_id]
-                    history = MemberHistory(
-                        group_id=group_id,
-                        user_id=user_id,
-                        nickname=old_member.nickname,
-                        action="leave",
-                        backup_id=backup.id,
-                    )
-                    session.add(history)
+                # 记录成员变化历史 (批量插入，整批共用一个时间戳)
+                now = datetime.utcnow()
+                history_rows = [
+                    {
+                        "group_id": group_id,
+                        "user_id": user_id,
+                        "nickname": by_id[user_id].get("nickname", ""),
+                        "action": "join",
+                        "backup_id": backup.id,
+                        "timestamp": now,
+                    }
+                    for user_id in joined_ids
+                ]
+                history_rows.extend(
+                    {
+                        "group_id": group_id,
+                        "user_id": user_id,
+                        "nickname": old_members[user_id].nickname,
+                        "action": "leave",
+                        "backup_id": backup.id,
+                        "timestamp": now,
+                    }
+                    for user_id in left_ids
+                )
+                if history_rows:
+                    await session.execute(insert(MemberHistory), history_rows)
                 
                 # 更新成员表
-                await self._update_members(session, group_id, members_data)
+                await self._update_members(session, group_id, by_id)
                 
-                # 保存备份成员快照
-                for member_data in members_data:
-                    backup_member = BackupMember(
-                        backup_id=backup.id,
-                        user_id=member_data.get("user_id"),
-                        nickname=member_data.get("nickname", ""),
-                        card=member_data.get("card", ""),
-                        sex=member_data.get("sex", "unknown"),
-                        role=member_data.get("role", "member"),
-                        level=member_data.get("level", ""),
-                        title=member_data.get("title", ""),
-                        join_time=member_data.get("join_time"),
-                        last_sent_time=member_data.get("last_sent_time"),
+                # 保存备份文件 (增量备份只记录相对最近一次全量备份的差异)
+                saved = None
+                if backup_type == BackupType.INCREMENTAL:
+                    saved = await self._save_incremental_file(
+                        session, backup, group_id, by_id
                     )
-                    session.add(backup_member)
-                
-                # 保存备份文件
-                file_path, file_size = await self._save_backup_file(
-                    backup.id, group_id, members_data
-                )
+                    if saved is None:
+                        logger.info(f"群 {group_id} 没有可用的全量备份，本次改为全量备份")
+                        backup.backup_type = BackupType.FULL.value
+                if saved is None:
+                    saved = await self._save_backup_file(
+                        session, backup.id, group_id, members_data
+                    )
+                file_path, file_size, file_hash = saved
                 
                 # 更新备份记录
                 backup.status = BackupStatus.SUCCESS.value
@@ -202,23 +273,25 @@ class BackupManager:
                 backup.left_members = len(left_ids)
                 backup.file_path = file_path
                 backup.file_size = file_size
+                backup.file_hash = file_hash
                 backup.completed_at = datetime.utcnow()
+                roles = Counter(m.get("role", "member") for m in members_data)
                 backup.summary = {
                     "total": len(members_data),
                     "joined": list(joined_ids),
                     "left": list(left_ids),
-                    "owners": len([m for m in members_data if m.get("role") == "owner"]),
-                    "admins": len([m for m in members_data if m.get("role") == "admin"]),
+                    "owners": roles.get("owner", 0),
+                    "admins": roles.get("admin", 0),
                 }
                 
-                # 更新群组最后备份时间
-                result = await session.execute(
-                    select(Group).where(Group.group_id == group_id)
+                # 写入群信息并更新最后备份时间 (单条 UPSERT)
+                await self._save_group(
+                    session,
+                    group_id,
+                    group_info,
+                    member_count=len(members_data),
+                    last_backup_at=datetime.utcnow(),
                 )
-                group = result.scalar_one_or_none()
-                if group:
-                    group.last_backup_at = datetime.utcnow()
-                    group.member_count = len(members_data)
                 
                 await session.commit()
                 
@@ -232,7 +305,9 @@ class BackupManager:
                 return backup
                 
             except Exception as e:
-                # 更新备份状态为失败
+                # 撤销本次已写入的部分数据 (如备份成员快照)，再记录失败状态
+                await session.rollback()
+                await session.refresh(backup)
                 backup.status = BackupStatus.FAILED.value
                 backup.error_message = str(e)
                 backup.completed_at = datetime.utcnow()
@@ -241,6 +316,33 @@ class BackupManager:
                 logger.error(f"备份失败: {group_id} - {str(e)}")
                 raise
     
+    async def _receive_members(
+        self,
+        session: AsyncSession,
+        backup_id: int,
+        group_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        流式接收群成员，每满一批即写入备份成员快照
+        
+        Returns:
+            完整的成员列表 (备份文件与成员对比仍需要全量数据)
+        """
+        members_data: List[Dict[str, Any]] = []
+        batch: List[Dict[str, Any]] = []
+        
+        async for member in self.client.iter_group_member_list(group_id):
+            members_data.append(member)
+            batch.append(member)
+            if len(batch) >= MEMBER_INSERT_BATCH:
+                await BackupMember.bulk_insert(session, backup_id, batch)
+                batch = []
+        
+        if batch:
+            await BackupMember.bulk_insert(session, backup_id, batch)
+        
+        return members_data
+    
     async def _get_current_members(
         self,
         session: AsyncSession,
@@ -257,40 +359,71 @@ class BackupManager:
         self,
         session: AsyncSession,
         group_id: int,
-        members_data: List[Dict[str, Any]]
+        by_id: Dict[int, Dict[str, Any]]
     ):
-        """更新成员表"""
-        # 删除现有成员
+        """
+        更新成员表 (UPSERT 现有成员，删除已退群成员)
+        
+        本次 UPSERT 的成员 updated_at 都写为同一个时间戳，未被写到的即为已退群成员，
+        按时间戳删除，无需把全部在群成员 ID 作为绑定参数发送。
+        """
+        now = datetime.utcnow()
+        if by_id:
+            stmt = dialect_insert(session, Member)
+            columns = [
+                c.name for c in Member.__table__.columns
+                if c.name not in ("id", "group_id", "user_id", "created_at")
+            ]
+            set_ = {name: stmt.excluded[name] for name in columns}
+            set_["updated_at"] = now
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["group_id", "user_id"],
+                    set_=set_
+                ),
+                Member.to_insert_rows(
+                    group_id, by_id.values(), created_at=now, updated_at=now
+                )
+            )
+        
+        # 删除已不在群内的成员 (本次未被 UPSERT 写到的行)
         await session.execute(
-            delete(Member).where(Member.group_id == group_id)
+            delete(Member).where(
+                Member.group_id == group_id,
+                or_(Member.updated_at != now, Member.updated_at.is_(None))
+            )
         )
-        
-        # 插入新成员
-        for data in members_data:
-            member = Member.from_onebot_data(group_id, data)
-            session.add(member)
     
     async def _save_backup_file(
         self,
+        session: AsyncSession,
         backup_id: int,
         group_id: int,
         members_data: List[Dict[str, Any]]
-    ) -> Tuple[str, int]:
+    ) -> Tuple[str, int, str]:
         """
         保存备份文件
         
+        若成员数据与该群已有备份完全一致 (全部字段的 SHA-256 相同)，
+        则硬链接已有文件，不再重复写盘。此时文件头部记录的仍是原备份的
+        backup_id/timestamp，以数据库中的备份记录为准。
+        
         Returns:
-            (文件路径, 文件大小)
+            (文件路径, 文件大小, 成员数据哈希)
         """
-        # 构建文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"backup_{group_id}_{timestamp}_{backup_id}.json"
+        file_path, timestamp = self._build_file_path(backup_id, group_id)
         
-        if self.compression:
-            filename += ".gz"
+        # 计算成员数据哈希，查找内容相同的已有备份文件
+        file_hash = await asyncio.to_thread(self._hash_members, members_data)
+        previous = await self._find_same_backup(session, group_id, file_hash)
         
-        file_path = self.backup_dir / str(group_id) / filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        if previous:
+            file_size = await asyncio.to_thread(
+                self._link_sync, Path(previous.file_path), file_path
+            )
+            if file_size is not None:
+                logger.info(f"成员数据未变化，已链接备份文件: {previous.file_path} -> {file_path}")
+                return str(file_path), file_size, file_hash
         
         # 准备数据
         backup_data = {
@@ -301,20 +434,189 @@ class BackupManager:
             "members": members_data,
         }
         
-        json_data = json.dumps(backup_data, ensure_ascii=False, indent=2)
+        # 序列化与写盘在线程池中执行，避免阻塞事件循环
+        file_size = await asyncio.to_thread(self._save_sync, file_path, backup_data)
+        logger.info(f"备份文件已保存: {file_path} ({file_size} bytes)")
         
-        # 保存文件
-        if self.compression:
-            with gzip.open(file_path, 'wt', encoding='utf-8') as f:
-                f.write(json_data)
+        return str(file_path), file_size, file_hash
+    
+    async def _save_incremental_file(
+        self,
+        session: AsyncSession,
+        backup: Backup,
+        group_id: int,
+        by_id: Dict[int, Dict[str, Any]]
+    ) -> Optional[Tuple[str, int, None]]:
+        """
+        保存增量备份文件
+        
+        与该群最近一次全量备份比较，只记录新增、移除的成员及字段变化，
+        并在备份记录上写入所基于的全量备份 (base_backup_id)。
+        
+        Returns:
+            (文件路径, 文件大小, None)，没有可用的全量备份时返回 None
+        """
+        base = await self._find_base_backup(session, group_id)
+        if base is None:
+            return None
+        
+        # 先比较快照中的内容哈希，只为哈希不同的成员读取旧字段值；
+        # 旧快照没有哈希时回退为读取基准备份文件逐字段比较
+        result = await session.execute(
+            select(BackupMember.user_id, BackupMember.content_hash)
+            .where(BackupMember.backup_id == base.id)
+        )
+        base_hashes = dict(result.all())
+        
+        if base_hashes and None not in base_hashes.values():
+            changed_ids = [
+                user_id for user_id in by_id.keys() & base_hashes.keys()
+                if BackupMember.compute_content_hash(by_id[user_id]) != base_hashes[user_id]
+            ]
+            base_members = dict.fromkeys(base_hashes)
+            if changed_ids:
+                result = await session.execute(
+                    select(BackupMember.user_id, *(getattr(BackupMember, f) for f in INCREMENTAL_FIELDS))
+                    .where(
+                        BackupMember.backup_id == base.id,
+                        BackupMember.user_id.in_(changed_ids),
+                    )
+                )
+                base_members.update((row.user_id, row._asdict()) for row in result)
         else:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(json_data)
+            base_members = {
+                m.get("user_id"): m async for m in self.iter_backup_members(base.file_path)
+            }
+            changed_ids = by_id.keys() & base_members.keys()
         
-        file_size = file_path.stat().st_size
-        logger.info(f"备份文件已保存: {file_path} ({file_size} bytes)")
+        changed = []
+        for user_id in changed_ids:
+            new, old = by_id[user_id], base_members[user_id]
+            for field in INCREMENTAL_FIELDS:
+                if new.get(field) != old.get(field):
+                    changed.append({
+                        "user_id": user_id,
+                        "field": field,
+                        "old": old.get(field),
+                        "new": new.get(field),
+                    })
+        
+        file_path, timestamp = self._build_file_path(backup.id, group_id)
+        backup_data = {
+            "backup_id": backup.id,
+            "group_id": group_id,
+            "timestamp": timestamp,
+            "base_backup_id": base.id,
+            "member_count": len(by_id),
+            "added": [by_id[uid] for uid in by_id.keys() - base_members.keys()],
+            "removed": list(base_members.keys() - by_id.keys()),
+            "changed": changed,
+        }
+        
+        file_size = await asyncio.to_thread(self._save_sync, file_path, backup_data)
+        logger.info(
+            f"增量备份文件已保存: {file_path} ({file_size} bytes), "
+            f"基于备份 {base.id}, 变更 {len(changed)} 项"
+        )
+        
+        backup.base_backup_id = base.id
+        return str(file_path), file_size, None
+    
+    async def _find_base_backup(
+        self,
+        session: AsyncSession,
+        group_id: int
+    ) -> Optional[Backup]:
+        """查找该群最近一次成功的全量备份 (作为增量备份的基准)"""
+        result = await session.execute(
+            select(Backup)
+            .where(
+                Backup.group_id == group_id,
+                Backup.status == BackupStatus.SUCCESS.value,
+                Backup.backup_type.in_([BackupType.FULL.value, BackupType.MANUAL.value]),
+                Backup.file_path.is_not(None),
+            )
+            .order_by(Backup.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    def _build_file_path(self, backup_id: int, group_id: int) -> Tuple[Path, str]:
+        """
+        构建备份文件路径
+        
+        Returns:
+            (文件路径, 时间戳)
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"backup_{group_id}_{timestamp}_{backup_id}.json{self._file_suffix}"
+        return self.backup_dir / str(group_id) / filename, timestamp
+    
+    async def _find_same_backup(
+        self,
+        session: AsyncSession,
+        group_id: int,
+        file_hash: str
+    ) -> Optional[Backup]:
+        """查找成员数据哈希相同、文件格式一致的最近一次成功备份"""
+        result = await session.execute(
+            select(Backup)
+            .where(
+                Backup.group_id == group_id,
+                Backup.status == BackupStatus.SUCCESS.value,
+                Backup.file_hash == file_hash,
+                Backup.compressed == self.compression,
+                Backup.file_path.endswith(f".json{self._file_suffix}"),
+            )
+            .order_by(Backup.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    def _hash_members(members_data: List[Dict[str, Any]]) -> str:
+        """
+        计算成员数据的 SHA-256 (OpenSSL 会自动使用 SHA-NI 指令)
         
-        return str(file_path), file_size
+        覆盖成员的全部字段：按 user_id 排序、键按名称排序，并固定使用标准库
+        json 编码，保证结果与字段顺序及是否安装 orjson 无关。
+        """
+        members = sorted(members_data, key=lambda m: m.get("user_id") or 0)
+        payload = json.dumps(
+            members, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _link_sync(source: Path, file_path: Path) -> Optional[int]:
+        """硬链接已有备份文件，失败时返回 None"""
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            os.link(source, file_path)
+        except OSError as e:
+            logger.warning(f"链接备份文件失败，改为重新写入: {source} - {str(e)}")
+            return None
+        return file_path.stat().st_size
+    
+    def _save_sync(self, file_path: Path, backup_data: Dict[str, Any]) -> int:
+        """同步写入备份文件，返回文件大小"""
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # 序列化为 UTF-8 字节后以二进制模式写入，省去文本层编码
+        payload = json_dumps(backup_data)
+        
+        if self._file_suffix == ".zst":
+            cctx = zstandard.ZstdCompressor(level=ZSTD_COMPRESS_LEVEL, threads=-1)
+            with open(file_path, 'wb') as raw, cctx.stream_writer(raw) as f:
+                f.write(payload)
+        elif self._file_suffix == ".gz":
+            with gzip.open(file_path, 'wb', compresslevel=GZIP_COMPRESS_LEVEL) as f:
+                f.write(payload)
+        else:
+            with open(file_path, 'wb') as f:
+                f.write(payload)
+        
+        return file_path.stat().st_size
     
     async def get_backup_history(
         self,
@@ -340,6 +642,39 @@ class BackupManager:
             )
             return list(result.scalars().all())
     
+    async def get_backup_history_brief(
+        self,
+        group_id: int,
+        limit: int = 10
+    ) -> List[Row]:
+        """
+        获取备份历史的列表字段 (不读取摘要、备注等大字段)
+        
+        Args:
+            group_id: 群号
+            limit: 返回数量限制
+            
+        Returns:
+            包含 id, backup_type, status, member_count, new_members,
+            left_members, created_at 的行列表
+        """
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(
+                    Backup.id,
+                    Backup.backup_type,
+                    Backup.status,
+                    Backup.member_count,
+                    Backup.new_members,
+                    Backup.left_members,
+                    Backup.created_at,
+                )
+                .where(Backup.group_id == group_id)
+                .order_by(Backup.created_at.desc())
+                .limit(limit)
+            )
+            return list(result.all())
+    
     async def get_backup_members(self, backup_id: int) -> List[BackupMember]:
         """
         获取备份中的成员列表
@@ -356,6 +691,44 @@ class BackupManager:
             )
             return list(result.scalars().all())
     
+    async def _get_member_rows(self, backup_id: int) -> List[Row]:
+        """按列读取备份成员 (Row 字段同 BackupMember.FIELDS，不构建 ORM 对象)"""
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(*(getattr(BackupMember, f) for f in BackupMember.FIELDS))
+                .where(BackupMember.backup_id == backup_id)
+            )
+            return list(result.all())
+    
+    async def preview_backup_members(
+        self,
+        backup_id: int,
+        limit: int = 20
+    ) -> Tuple[int, List[BackupMember]]:
+        """
+        获取备份成员总数和前若干名成员 (用于预览，不加载全部成员)
+        
+        Args:
+            backup_id: 备份ID
+            limit: 返回的成员数量
+            
+        Returns:
+            (成员总数, 前 limit 名成员)
+        """
+        async with db_manager.get_async_session() as session:
+            total = await session.scalar(
+                select(func.count())
+                .select_from(BackupMember)
+                .where(BackupMember.backup_id == backup_id)
+            )
+            result = await session.execute(
+                select(BackupMember)
+                .where(BackupMember.backup_id == backup_id)
+                .order_by(BackupMember.id)
+                .limit(limit)
+            )
+            return total, list(result.scalars().all())
+    
     async def load_backup_file(self, file_path: str) -> Dict[str, Any]:
         """
         加载备份文件
@@ -366,14 +739,101 @@ class BackupManager:
         Returns:
             备份数据
         """
-        path = Path(file_path)
-        
+        return await asyncio.to_thread(self._load_sync, Path(file_path))
+    
+    @staticmethod
+    def _open_backup(path: Path):
+        """按文件后缀以二进制模式打开 (并解压) 备份文件"""
+        if path.suffix == '.zst':
+            if zstandard is None:
+                raise RuntimeError(f"读取 zstd 备份需要安装 zstandard: {path}")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
         if path.suffix == '.gz':
-            with gzip.open(path, 'rt', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+    
+    @classmethod
+    def _load_sync(cls, path: Path) -> Dict[str, Any]:
+        """同步读取并解析备份文件"""
+        with cls._open_backup(path) as f:
+            return json_loads(f.read())
+    
+    async def iter_backup_members(self, file_path: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式读取备份文件中的成员记录
+        
+        适用于大型备份：逐条解析 members 数组，不在内存中构建完整文档。
+        未安装 ijson 时回退为一次性加载。增量备份文件不含 members，
+        需使用 load_backup_members 还原。
+        
+        Args:
+            file_path: 文件路径
+            
+        Yields:
+            成员数据
+        """
+        if ijson is None:
+            data = await self.load_backup_file(file_path)
+            for member in data.get("members", []):
+                yield member
+            return
+        
+        # 打开/解压/解析都在线程池中进行，每次取出一批，避免阻塞事件循环；
+        # ijson 需要字节流，默认自动选用最快的可用后端 (yajl2_c)
+        f = await asyncio.to_thread(self._open_backup, Path(file_path))
+        try:
+            items = ijson.items(f, 'members.item', use_float=True)
+            while True:
+                batch = await asyncio.to_thread(
+                    lambda: list(islice(items, BACKUP_READ_BATCH))
+                )
+                for member in batch:
+                    yield member
+                if len(batch) < BACKUP_READ_BATCH:
+                    break
+        finally:
+            await asyncio.to_thread(f.close)
+    
+    async def load_backup_members(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        从备份文件还原完整成员列表
+        
+        全量备份直接返回 members；增量备份先还原其基准全量备份，
+        再依次应用新增、移除和字段变化。
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            成员列表
+        """
+        data = await self.load_backup_file(file_path)
+        base_backup_id = data.get("base_backup_id")
+        
+        if base_backup_id is None:
+            return data.get("members", [])
+        
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Backup.file_path).where(Backup.id == base_backup_id)
+            )
+            base_path = result.scalar_one_or_none()
+        
+        if not base_path:
+            raise ValueError(f"增量备份的基准备份不存在: {base_backup_id}")
+        
+        members = {m.get("user_id"): m for m in await self.load_backup_members(base_path)}
+        
+        for user_id in data.get("removed", []):
+            members.pop(user_id, None)
+        for change in data.get("changed", []):
+            member = members.get(change["user_id"])
+            if member is not None:
+                member[change["field"]] = change["new"]
+        for member in data.get("added", []):
+            members[member.get("user_id")] = member
+        
+        return list(members.values())
     
     async def compare_backups(
         self,
@@ -390,23 +850,24 @@ class BackupManager:
         Returns:
             比较结果
         """
-        members_1 = await self.get_backup_members(backup_id_1)
-        members_2 = await self.get_backup_members(backup_id_2)
+        # 两次查询各用独立会话，可并发执行
+        members_1, members_2 = await asyncio.gather(
+            self._get_member_rows(backup_id_1),
+            self._get_member_rows(backup_id_2)
+        )
         
         users_1 = {m.user_id: m for m in members_1}
-        users_2 = {m.user_id: m for m in members_2}
-        
-        ids_1 = set(users_1.keys())
-        ids_2 = set(users_2.keys())
         
-        joined = ids_2 - ids_1
-        left = ids_1 - ids_2
-        remained = ids_1 & ids_2
-        
-        # 检查名片变化
+        # 一次遍历新备份：区分新加入与留存成员，并检查名片变化
+        joined = []
         card_changed = []
-        for user_id in remained:
-            m1, m2 = users_1[user_id], users_2[user_id]
+        remained = 0
+        for user_id, m2 in {m.user_id: m for m in members_2}.items():
+            m1 = users_1.pop(user_id, None)
+            if m1 is None:
+                joined.append({"user_id": user_id, **m2._asdict()})
+                continue
+            remained += 1
             if m1.card != m2.card:
                 card_changed.append({
                     "user_id": user_id,
@@ -414,10 +875,11 @@ class BackupManager:
                     "new_card": m2.card,
                 })
         
+        # users_1 中剩余的即为退群成员
         return {
-            "joined": [{"user_id": uid, **users_2[uid].to_dict()} for uid in joined],
-            "left": [{"user_id": uid, **users_1[uid].to_dict()} for uid in left],
-            "remained": len(remained),
+            "joined": joined,
+            "left": [{"user_id": uid, **m._asdict()} for uid, m in users_1.items()],
+            "remained": remained,
             "card_changed": card_changed,
         }
     
@@ -425,36 +887,94 @@ class BackupManager:
         """
         清理旧备份
         
+        仍被保留的增量备份所依赖的全量备份不会被删除，
+        待依赖它的增量备份都被清理后再随之删除。
+        
         Args:
             group_id: 群号
             keep_count: 保留的备份数量
         """
         async with db_manager.get_async_session() as session:
-            # 获取所有备份,按时间排序
-            result = await session.execute(
-                select(Backup)
-                .where(Backup.group_id == group_id)
-                .order_by(Backup.created_at.desc())
-            )
-            backups = list(result.scalars().all())
+            # 按时间倒序跳过最新的 keep_count 个，其余为待清理的备份
+            all_rows = await self._get_group_backup_rows(session, group_id)
+            kept_ids = {r.id for r in all_rows[:keep_count]}
+            base_ids = self._incremental_base_ids(all_rows)
+            protected = {base_ids[i] for i in kept_ids if i in base_ids}
+            rows = [r for r in all_rows[keep_count:] if r.id not in protected]
             
-            if len(backups) <= keep_count:
+            if not rows:
                 return
             
-            # 删除多余的备份
-            for backup in backups[keep_count:]:
-                # 删除备份文件
-                if backup.file_path:
-                    file_path = Path(backup.file_path)
-                    if file_path.exists():
-                        file_path.unlink()
-                        logger.info(f"已删除备份文件: {file_path}")
-                
-                # 删除数据库记录
-                await session.delete(backup)
+            backup_ids = [r.id for r in rows]
             
+            # 批量删除数据库记录
+            await session.execute(
+                delete(BackupMember).where(BackupMember.backup_id.in_(backup_ids))
+            )
+            await session.execute(
+                delete(Backup).where(Backup.id.in_(backup_ids))
+            )
             await session.commit()
-            logger.info(f"清理了 {len(backups) - keep_count} 个旧备份")
+        
+        # 在线程池中删除备份文件，避免阻塞事件循环
+        file_paths = [r.file_path for r in rows if r.file_path]
+        if file_paths:
+            await asyncio.to_thread(self._unlink_files, file_paths)
+        
+        if protected:
+            logger.info(f"保留了 {len(protected)} 个仍被增量备份依赖的全量备份")
+        logger.info(f"清理了 {len(rows)} 个旧备份")
+    
+    async def _get_group_backup_rows(
+        self,
+        session: AsyncSession,
+        group_id: int
+    ) -> List[Row]:
+        """获取群的全部备份 (按创建时间倒序，只含清理与依赖计算需要的列)"""
+        result = await session.execute(
+            select(
+                Backup.id, Backup.file_path, Backup.backup_type,
+                Backup.status, Backup.base_backup_id
+            )
+            .where(Backup.group_id == group_id)
+            .order_by(Backup.created_at.desc())
+        )
+        return result.all()
+    
+    @staticmethod
+    def _incremental_base_ids(rows: List[Row]) -> Dict[int, int]:
+        """
+        计算增量备份所依赖的全量备份
+        
+        旧版本创建的增量备份没有记录 base_backup_id，按创建增量备份时的规则
+        推断：取在它之前最近一次成功的全量/手动备份。
+        
+        Args:
+            rows: _get_group_backup_rows 返回的同一个群的备份
+        
+        Returns:
+            {增量备份ID: 全量备份ID}
+        """
+        base_ids: Dict[int, int] = {}
+        last_full = None
+        for row in reversed(rows):
+            if row.status != BackupStatus.SUCCESS.value or not row.file_path:
+                continue
+            if row.backup_type == BackupType.INCREMENTAL.value:
+                base_id = row.base_backup_id or last_full
+                if base_id is not None:
+                    base_ids[row.id] = base_id
+            elif row.backup_type in (BackupType.FULL.value, BackupType.MANUAL.value):
+                last_full = row.id
+        return base_ids
+    
+    @staticmethod
+    def _unlink_files(file_paths: List[str]):
+        """删除备份文件"""
+        for file_path in map(Path, file_paths):
+            if file_path.exists():
+                file_path.unlink()
+                logger.info(f"已删除备份文件: {file_path}")
     
     async def delete_backup(self, backup_id: int):
         """
@@ -473,6 +993,18 @@ class BackupManager:
             if not backup:
                 raise ValueError(f"备份不存在: {backup_id}")
             
+            # 仍有增量备份依赖它时拒绝删除，否则这些增量备份将无法还原
+            if backup.backup_type != BackupType.INCREMENTAL.value:
+                rows = await self._get_group_backup_rows(session, backup.group_id)
+                dependents = sorted(
+                    inc_id for inc_id, base_id in self._incremental_base_ids(rows).items()
+                    if base_id == backup_id
+                )
+                if dependents:
+                    raise ValueError(
+                        f"备份 {backup_id} 仍被增量备份 {dependents} 依赖，请先删除这些增量备份"
+                    )
+            
             # 删除备份文件
             if backup.file_path:
                 file_path = Path(backup.file_path)
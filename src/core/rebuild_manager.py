@@ -2,11 +2,15 @@
 重建管理器 - 群组重建与成员邀请逻辑
 """
 import asyncio
+import inspect
+import time
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Set, Tuple, AsyncIterator, Iterable, Deque
 from dataclasses import dataclass, field
 from enum import Enum
-from sqlalchemy import select
+from aiolimiter import AsyncLimiter
+from sqlalchemy import select, func, case, or_, and_
 
 from src.api.onebot import OneBotAPI
 from src.models import db_manager, Backup, BackupMember
@@ -14,6 +18,35 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 好友列表缓存时间(秒)，连续多次重建/预览时复用
+FRIEND_CACHE_TTL = 60.0
+
+# 进度中最多保留的逐成员结果数 (超出后丢弃最早的结果，计数不受影响)
+MAX_KEPT_RESULTS = 10000
+
+# 重建时并发处理成员的最大 worker 数
+MAX_REBUILD_WORKERS = 8
+
+# 目标群成员列表缓存时间(秒)，覆盖 "预览 -> 执行" 的间隔
+GROUP_MEMBERS_CACHE_TTL = 5.0
+
+# 进度回调节流: 每处理若干成员或间隔若干秒回调一次
+PROGRESS_CALLBACK_EVERY = 10
+PROGRESS_CALLBACK_INTERVAL = 0.25
+
+# 从数据库分页读取备份成员时每页的行数
+MEMBER_PAGE_SIZE = 500
+
+# 重建时的处理顺序: 普通成员 -> 管理员 (群主不处理)
+INVITE_ROLE_ORDER = ("member", "admin")
+ROLE_RANK = {role: rank for rank, role in enumerate(INVITE_ROLE_ORDER)}
+
+
+async def _iter_list(items: Iterable[BackupMember]) -> AsyncIterator[BackupMember]:
+    """将内存中的成员列表包装为异步迭代器"""
+    for item in items:
+        yield item
+
 
 class RebuildStatus(Enum):
     """重建状态"""
@@ -33,17 +66,27 @@ class InviteStatus(Enum):
     SKIPPED = "skipped"
 
 
-@dataclass
+@dataclass(slots=True)
 class InviteResult:
     """邀请结果"""
     user_id: int
     nickname: str
     status: InviteStatus
     message: str = ""
-    timestamp: datetime = field(default_factory=datetime.utcnow)
+    # 单调时钟时间戳 (只用于结果之间的先后与间隔，避免逐条创建 datetime)
+    timestamp: float = field(default_factory=time.monotonic)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "user_id": self.user_id,
+            "nickname": self.nickname,
+            "status": self.status.value,
+            "message": self.message,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class RebuildProgress:
     """重建进度"""
     total: int = 0
@@ -52,34 +95,60 @@ class RebuildProgress:
     failed: int = 0
     skipped: int = 0
     status: RebuildStatus = RebuildStatus.PENDING
-    current_user: Optional[int] = None
-    results: List[InviteResult] = field(default_factory=list)
+    # 正在被 worker 处理的成员 (并发处理时可能有多个)
+    in_flight_users: Set[int] = field(default_factory=set)
+    results: Deque[InviteResult] = field(
+        default_factory=lambda: deque(maxlen=MAX_KEPT_RESULTS)
+    )
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     error_message: str = ""
+    # 开始/完成时间的 ISO 字符串缓存，避免每次 to_dict 重新格式化
+    _started_iso: Optional[str] = field(default=None, init=False, repr=False)
+    _completed_iso: Optional[str] = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        if self.started_at:
+            self._started_iso = self.started_at.isoformat()
+        if self.completed_at:
+            self._completed_iso = self.completed_at.isoformat()
+    
+    def mark_completed(self):
+        """记录完成时间"""
+        self.completed_at = datetime.utcnow()
+        self._completed_iso = self.completed_at.isoformat()
     
     @property
     def progress_percent(self) -> float:
-        """进度百分比"""
+        """进度百分比 (保留两位小数)"""
         if self.total == 0:
             return 0.0
-        return (self.processed / self.total) * 100
+        # 整数运算截断到 0.01%，无需浮点除法后再 round
+        return self.processed * 10000 // self.total / 100
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
+    def to_dict(self, include_results: bool = False) -> Dict[str, Any]:
+        """
+        转换为字典
+        
+        Args:
+            include_results: 是否包含每个成员的处理结果
+        """
+        data = {
             "total": self.total,
             "processed": self.processed,
             "success": self.success,
             "failed": self.failed,
             "skipped": self.skipped,
             "status": self.status.value,
-            "progress_percent": round(self.progress_percent, 2),
-            "current_user": self.current_user,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "progress_percent": self.progress_percent,
+            "in_flight_users": sorted(self.in_flight_users),
+            "started_at": self._started_iso,
+            "completed_at": self._completed_iso,
             "error_message": self.error_message,
         }
+        if include_results:
+            data["results"] = [r.to_dict() for r in self.results]
+        return data
 
 
 class RebuildManager:
@@ -97,7 +166,8 @@ class RebuildManager:
         restore_titles: bool = False,
         send_welcome: bool = True,
         welcome_message: str = "欢迎回到群组!",
-        continue_on_error: bool = True
+        continue_on_error: bool = True,
+        concurrent_requests: int = 5
     ):
         """
         初始化重建管理器
@@ -114,6 +184,7 @@ class RebuildManager:
             send_welcome: 是否发送欢迎消息
             welcome_message: 欢迎消息内容
             continue_on_error: 遇到错误是否继续
+            concurrent_requests: 恢复成员信息时的最大并发请求数
         """
         self.client = client
         self.invites_per_minute = invites_per_minute
@@ -130,10 +201,27 @@ class RebuildManager:
         # 计算每次邀请的间隔
         self.invite_interval = 60.0 / invites_per_minute
         
+        # 令牌桶限速：每个间隔一个令牌，不允许突发；
+        # 已消耗在 API 调用上的时间计入间隔，不再额外叠加固定 sleep
+        self._limiter = AsyncLimiter(1, self.invite_interval)
+        
+        # 限制同时进行的恢复请求数 (名片/头衔/管理员并发发送)
+        self._semaphore = asyncio.Semaphore(concurrent_requests)
+        
+        # 好友 ID 缓存: (获取时间, 好友 ID 集合)
+        self._friend_ids_cache: Optional[Tuple[float, Set[int]]] = None
+        
+        # 群成员缓存: 群号 -> (获取时间, {user_id: 成员信息})
+        self._group_members_cache: Dict[int, Tuple[float, Dict[int, Dict[str, Any]]]] = {}
+        
         # 状态
         self._progress: Optional[RebuildProgress] = None
         self._cancelled = False
-        self._paused = False
+        self._last_callback_at = 0.0
+        
+        # 暂停控制: 未暂停时为 set 状态，暂停时 clear，恢复/取消时 set 唤醒等待者
+        self._resume_event = asyncio.Event()
+        self._resume_event.set()
         
         logger.info(f"重建管理器已初始化: {invites_per_minute}/min")
     
@@ -145,24 +233,52 @@ class RebuildManager:
     def cancel(self):
         """取消重建"""
         self._cancelled = True
+        self._resume_event.set()
         if self._progress:
             self._progress.status = RebuildStatus.CANCELLED
         logger.info("重建任务已取消")
     
     def pause(self):
         """暂停重建"""
-        self._paused = True
+        self._resume_event.clear()
         if self._progress:
             self._progress.status = RebuildStatus.PAUSED
         logger.info("重建任务已暂停")
     
     def resume(self):
         """恢复重建"""
-        self._paused = False
+        self._resume_event.set()
         if self._progress:
             self._progress.status = RebuildStatus.RUNNING
         logger.info("重建任务已恢复")
     
+    async def _get_friend_ids(self) -> Set[int]:
+        """获取好友 ID 集合 (带 TTL 缓存)"""
+        cached = self._friend_ids_cache
+        if cached and time.monotonic() - cached[0] < FRIEND_CACHE_TTL:
+            return cached[1]
+        
+        friends = await self.client.get_friend_list()
+        friend_ids = {f.get("user_id") for f in friends}
+        self._friend_ids_cache = (time.monotonic(), friend_ids)
+        return friend_ids
+    
+    async def _get_current_members(self, group_id: int) -> Dict[int, Dict[str, Any]]:
+        """
+        获取群当前成员 (user_id -> 成员信息)
+        
+        使用 no_cache 获取最新数据；结果短暂缓存，
+        "预览后立即执行" 时不重复拉取成员列表。
+        """
+        cached = self._group_members_cache.get(group_id)
+        if cached and time.monotonic() - cached[0] < GROUP_MEMBERS_CACHE_TTL:
+            return cached[1]
+        
+        members = await self.client.get_group_member_list(group_id, no_cache=True)
+        current_map = {m.get("user_id"): m for m in members}
+        self._group_members_cache[group_id] = (time.monotonic(), current_map)
+        return current_map
+    
     async def rebuild_from_backup(
         self,
         backup_id: int,
@@ -184,27 +300,18 @@ class RebuildManager:
         """
         exclude_users = exclude_users or []
         
-        # 获取备份成员
-        async with db_manager.get_async_session() as session:
-            result = await session.execute(
-                select(BackupMember).where(BackupMember.backup_id == backup_id)
-            )
-            backup_members = list(result.scalars().all())
+        # 只统计数量，成员在重建过程中分页读取
+        backup_total, total = await self._count_backup_members(backup_id, exclude_users)
         
-        if not backup_members:
+        if not backup_total:
             raise ValueError(f"备份 {backup_id} 中没有成员数据")
         
-        logger.info(f"从备份 {backup_id} 重建群组 {target_group_id}, 成员数: {len(backup_members)}")
-        
-        # 过滤排除的用户
-        members_to_invite = [
-            m for m in backup_members 
-            if m.user_id not in exclude_users
-        ]
+        logger.info(f"从备份 {backup_id} 重建群组 {target_group_id}, 成员数: {backup_total}")
         
         return await self._rebuild_group(
             target_group_id,
-            members_to_invite,
+            self._iter_backup_members(backup_id, invite_order=True, exclude_users=exclude_users),
+            total,
             progress_callback
         )
     
@@ -242,61 +349,153 @@ class RebuildManager:
         self.restore_titles = restore_titles
         self.restore_admins = restore_admins
         
-        # 获取备份成员
-        async with db_manager.get_async_session() as session:
-            # 获取备份信息
-            backup_result = await session.execute(
-                select(Backup).where(Backup.id == backup_id)
-            )
-            backup = backup_result.scalar_one_or_none()
-            
-            if not backup:
-                raise ValueError(f"备份 {backup_id} 不存在")
-            
-            # 验证备份来源群（确保备份确实是这个群的）
-            if backup.group_id != group_id:
-                raise ValueError(f"备份 {backup_id} 不属于群组 {group_id}")
-            
-            # 获取备份成员
-            result = await session.execute(
-                select(BackupMember).where(BackupMember.backup_id == backup_id)
-            )
-            backup_members = list(result.scalars().all())
+        # 并发获取备份信息与成员数量 (各用独立会话)，成员在处理过程中分页读取
+        backup, (backup_total, total) = await asyncio.gather(
+            self._get_backup(backup_id),
+            self._count_backup_members(backup_id)
+        )
+        
+        if not backup:
+            raise ValueError(f"备份 {backup_id} 不存在")
         
-        if not backup_members:
+        # 验证备份来源群（确保备份确实是这个群的）
+        if backup.group_id != group_id:
+            raise ValueError(f"备份 {backup_id} 不属于群组 {group_id}")
+        
+        if not backup_total:
             raise ValueError(f"备份 {backup_id} 中没有成员数据")
         
         is_cross_group = target_group_id != group_id
-        logger.info(f"{'[DRY RUN] ' if dry_run else ''}从备份 {backup_id} (群 {group_id}) 重建到群 {target_group_id}, 成员数: {len(backup_members)}, 跨群: {is_cross_group}")
+        logger.info(f"{'[DRY RUN] ' if dry_run else ''}从备份 {backup_id} (群 {group_id}) 重建到群 {target_group_id}, 成员数: {backup_total}, 跨群: {is_cross_group}")
         
         if dry_run:
             # 模拟运行：只分析差异，不执行实际操作
-            return await self._dry_run_rebuild(target_group_id, backup_members, source_group_id=group_id)
+            return await self._dry_run_rebuild(
+                target_group_id,
+                self._iter_backup_members(backup_id),
+                backup_total,
+                source_group_id=group_id
+            )
         else:
             # 实际执行
-            progress = await self._rebuild_group(target_group_id, backup_members, None)
+            progress = await self._rebuild_group(
+                target_group_id,
+                self._iter_backup_members(backup_id, invite_order=True),
+                total,
+                None
+            )
+            # 统一由 RebuildProgress.to_dict 序列化；"success" 在接口中表示调用是否成功，
+            # 各计数沿用 *_count 键名
+            data = progress.to_dict(include_results=True)
             return {
+                **data,
                 "success": True,
-                "status": progress.status.value,
-                "total": progress.total,
-                "success_count": progress.success,
-                "failed_count": progress.failed,
-                "skipped_count": progress.skipped,
-                "results": [
-                    {
-                        "user_id": r.user_id,
-                        "nickname": r.nickname,
-                        "status": r.status.value,
-                        "message": r.message,
-                    }
-                    for r in progress.results
-                ]
+                "success_count": data["success"],
+                "failed_count": data["failed"],
+                "skipped_count": data["skipped"],
             }
     
+    async def _get_backup(self, backup_id: int) -> Optional[Backup]:
+        """获取备份记录"""
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Backup).where(Backup.id == backup_id)
+            )
+            return result.scalar_one_or_none()
+    
+    async def _count_backup_members(
+        self,
+        backup_id: int,
+        exclude_users: Optional[List[int]] = None
+    ) -> Tuple[int, int]:
+        """
+        统计备份成员数量
+        
+        Args:
+            backup_id: 备份ID
+            exclude_users: 排除的用户列表
+            
+        Returns:
+            (备份成员总数, 重建时需要处理的成员数)
+        """
+        to_process = BackupMember.role.in_(INVITE_ROLE_ORDER)
+        if exclude_users:
+            to_process = to_process & BackupMember.user_id.notin_(exclude_users)
+        
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(func.count(), func.count(case((to_process, 1))))
+                .select_from(BackupMember)
+                .where(BackupMember.backup_id == backup_id)
+            )
+            backup_total, total = result.one()
+        return backup_total, total
+    
+    async def _iter_backup_members(
+        self,
+        backup_id: int,
+        invite_order: bool = False,
+        exclude_users: Optional[List[int]] = None
+    ) -> AsyncIterator[BackupMember]:
+        """
+        分页读取备份成员
+        
+        每页使用独立的短会话，重建期间 (受邀请速率限制可能持续很久)
+        不会一直占用数据库连接和读事务。
+        
+        Args:
+            backup_id: 备份ID
+            invite_order: 只读取需处理的成员，并由数据库按重建顺序
+                (普通成员 -> 管理员) 排序
+            exclude_users: 排除的用户列表
+        """
+        filters = [BackupMember.backup_id == backup_id]
+        if exclude_users:
+            filters.append(BackupMember.user_id.notin_(exclude_users))
+        
+        if invite_order:
+            filters.append(BackupMember.role.in_(INVITE_ROLE_ORDER))
+            rank = case(ROLE_RANK, value=BackupMember.role)
+        else:
+            rank = None
+        
+        last_rank, last_id = 0, 0
+        while True:
+            if rank is None:
+                stmt = (
+                    select(BackupMember)
+                    .where(*filters, BackupMember.id > last_id)
+                    .order_by(BackupMember.id)
+                )
+            else:
+                # 按 (角色顺序, id) 做键集分页
+                stmt = (
+                    select(BackupMember)
+                    .where(*filters, or_(
+                        rank > last_rank,
+                        and_(rank == last_rank, BackupMember.id > last_id)
+                    ))
+                    .order_by(rank, BackupMember.id)
+                )
+            
+            async with db_manager.get_async_session() as session:
+                result = await session.execute(stmt.limit(MEMBER_PAGE_SIZE))
+                page = result.scalars().all()
+            
+            for member in page:
+                yield member
+            
+            if len(page) < MEMBER_PAGE_SIZE:
+                return
+            last_id = page[-1].id
+            if rank is not None:
+                last_rank = ROLE_RANK[page[-1].role]
+    
     async def _dry_run_rebuild(
         self,
         group_id: int,
-        backup_members: List[BackupMember],
+        backup_members: AsyncIterator[BackupMember],
+        total: int,
         source_group_id: int = None
     ) -> Dict[str, Any]:
         """
@@ -304,20 +503,18 @@ class RebuildManager:
         
         Args:
             group_id: 目标群号（恢复到哪个群）
-            backup_members: 备份成员列表
+            backup_members: 备份成员
+            total: 备份成员总数
             source_group_id: 备份来源群号（可选，用于显示跨群信息）
             
         Returns:
             预览信息
         """
         is_cross_group = source_group_id and source_group_id != group_id
-        changes = []
         
-        # 获取当前群成员（使用 no_cache 确保获取最新数据）
+        # 获取当前群成员
         try:
-            current_members = await self.client.get_group_member_list(group_id, no_cache=True)
-            current_map = {m.get("user_id"): m for m in current_members}
-            current_user_ids = set(current_map.keys())
+            current_map = await self._get_current_members(group_id)
         except Exception as e:
             logger.error(f"获取目标群成员失败: {str(e)}")
             raise ValueError(f"获取群成员失败: {str(e)}")
@@ -331,15 +528,14 @@ class RebuildManager:
         
         # 获取好友列表
         try:
-            friends = await self.client.get_friend_list()
-            friend_ids = set(f.get("user_id") for f in friends)
+            friend_ids = await self._get_friend_ids()
         except:
             friend_ids = set()
         
         # 统计
         stats = {
-            "total_backup_members": len(backup_members),
-            "current_members": len(current_user_ids),
+            "total_backup_members": total,
+            "current_members": len(current_map),
             "will_skip_bot": 0,
             "will_skip_already_in": 0,
             "will_skip_not_friend": 0,
@@ -349,102 +545,93 @@ class RebuildManager:
             "cannot_invite": 0,
         }
         
-        for member in backup_members:
+        # 循环中只记录元组: (user_id, 昵称, 操作, 原因, 变更明细元组)，最后统一转换为字典
+        rows = []
+        no_details = ()
+        restore_cards, restore_titles, restore_admins = (
+            self.restore_cards, self.restore_titles, self.restore_admins
+        )
+        
+        async for member in backup_members:
             user_id = member.user_id
             
             # 跳过 Bot 自身
             if user_id == bot_user_id:
                 stats["will_skip_bot"] += 1
-                changes.append({
-                    "user_id": user_id,
-                    "nickname": member.nickname,
-                    "action": "skip",
-                    "reason": "Bot自身",
-                    "details": []
-                })
+                rows.append((user_id, member.nickname, "skip", "Bot自身", no_details))
                 continue
             
             # 检查是否已在群内
-            if user_id in current_user_ids:
+            current_member = current_map.get(user_id)
+            if current_member is not None:
                 stats["will_skip_already_in"] += 1
-                current_member = current_map[user_id]
+                # 变更明细: (类型, 当前值, 备份值, 操作描述)
                 member_changes = []
                 
                 # 检查名片差异（备份值可能是空字符串，也需要恢复）
-                if self.restore_cards:
+                if restore_cards:
                     current_card = current_member.get("card", "") or ""
                     backup_card = member.card or ""
                     if current_card != backup_card:
-                        member_changes.append({
-                            "type": "card",
-                            "current": current_card,
-                            "backup": backup_card,
-                            "action": f"将名片从 '{current_card}' 改为 '{backup_card}'" if backup_card else f"清空名片（当前: '{current_card}'）"
-                        })
+                        member_changes.append((
+                            "card",
+                            current_card,
+                            backup_card,
+                            f"将名片从 '{current_card}' 改为 '{backup_card}'" if backup_card else f"清空名片（当前: '{current_card}'）"
+                        ))
                         stats["will_restore_card"] += 1
                 
                 # 检查头衔差异（备份值可能是空字符串，也需要恢复）
-                if self.restore_titles:
+                if restore_titles:
                     current_title = current_member.get("title", "") or ""
                     backup_title = member.title or ""
                     if current_title != backup_title:
-                        member_changes.append({
-                            "type": "title",
-                            "current": current_title,
-                            "backup": backup_title,
-                            "action": f"将头衔从 '{current_title}' 改为 '{backup_title}'" if backup_title else f"清空头衔（当前: '{current_title}'）"
-                        })
+                        member_changes.append((
+                            "title",
+                            current_title,
+                            backup_title,
+                            f"将头衔从 '{current_title}' 改为 '{backup_title}'" if backup_title else f"清空头衔（当前: '{current_title}'）"
+                        ))
                         stats["will_restore_title"] += 1
                 
                 # 检查管理员差异
-                if self.restore_admins and member.role == "admin":
+                if restore_admins and member.role == "admin":
                     current_role = current_member.get("role", "member")
                     if current_role != "admin" and current_role != "owner":
-                        member_changes.append({
-                            "type": "admin",
-                            "current": current_role,
-                            "backup": "admin",
-                            "action": f"将 {member.nickname} 设为管理员"
-                        })
+                        member_changes.append((
+                            "admin",
+                            current_role,
+                            "admin",
+                            f"将 {member.nickname} 设为管理员"
+                        ))
                         stats["will_restore_admin"] += 1
                 
                 if member_changes:
-                    changes.append({
-                        "user_id": user_id,
-                        "nickname": member.nickname,
-                        "action": "restore",
-                        "reason": "已在群内，将恢复信息",
-                        "details": member_changes
-                    })
+                    rows.append((user_id, member.nickname, "restore", "已在群内，将恢复信息", member_changes))
                 else:
-                    changes.append({
-                        "user_id": user_id,
-                        "nickname": member.nickname,
-                        "action": "skip",
-                        "reason": "已在群内，无需更改",
-                        "details": []
-                    })
+                    rows.append((user_id, member.nickname, "skip", "已在群内，无需更改", no_details))
             else:
                 # 不在群内的成员
+                stats["cannot_invite"] += 1
                 if user_id not in friend_ids:
                     stats["will_skip_not_friend"] += 1
-                    stats["cannot_invite"] += 1
-                    changes.append({
-                        "user_id": user_id,
-                        "nickname": member.nickname,
-                        "action": "cannot_invite",
-                        "reason": "非好友，无法邀请",
-                        "details": []
-                    })
+                    rows.append((user_id, member.nickname, "cannot_invite", "非好友，无法邀请", no_details))
                 else:
-                    stats["cannot_invite"] += 1
-                    changes.append({
-                        "user_id": user_id,
-                        "nickname": member.nickname,
-                        "action": "need_invite",
-                        "reason": "是好友，但OneBot标准不支持直接邀请入群",
-                        "details": []
-                    })
+                    rows.append((user_id, member.nickname, "need_invite", "是好友，但OneBot标准不支持直接邀请入群", no_details))
+        
+        changes = [
+            {
+                "user_id": user_id,
+                "nickname": nickname,
+                "action": action,
+                "reason": reason,
+                "details": [
+                    {"type": t, "current": current, "backup": backup, "action": desc}
+                    for t, current, backup, desc in details
+                ],
+            }
+            for user_id, nickname, action, reason, details in rows
+        ]
         
         return {
             "dry_run": True,
@@ -494,16 +681,24 @@ class RebuildManager:
             )
             backup_members.append(bm)
         
+        # 按顺序处理: 普通成员 -> 管理员
+        ordered = sorted(
+            (m for m in backup_members if m.role in ROLE_RANK),
+            key=lambda m: ROLE_RANK[m.role]
+        )
+        
         return await self._rebuild_group(
             target_group_id,
-            backup_members,
+            _iter_list(ordered),
+            len(ordered),
             progress_callback
         )
     
     async def _rebuild_group(
         self,
         target_group_id: int,
-        members: List[BackupMember],
+        members: AsyncIterator[BackupMember],
+        total: int,
         progress_callback: Callable[[RebuildProgress], None] = None
     ) -> RebuildProgress:
         """
@@ -511,7 +706,8 @@ class RebuildManager:
         
         Args:
             target_group_id: 目标群号
-            members: 要邀请的成员列表
+            members: 要邀请的成员 (已按处理顺序排列)
+            total: 成员总数
             progress_callback: 进度回调函数
             
         Returns:
@@ -519,20 +715,20 @@ class RebuildManager:
         """
         # 初始化进度
         self._progress = RebuildProgress(
-            total=len(members),
+            total=total,
             status=RebuildStatus.RUNNING,
             started_at=datetime.utcnow(),
         )
         self._cancelled = False
-        self._paused = False
+        self._resume_event.set()
+        self._last_callback_at = time.monotonic()
         
-        # 获取当前群成员（使用 no_cache 确保获取最新数据）
+        # 获取当前群成员
         try:
-            current_members = await self.client.get_group_member_list(target_group_id, no_cache=True)
-            current_user_ids = set(m.get("user_id") for m in current_members)
+            current_map = await self._get_current_members(target_group_id)
         except Exception as e:
             logger.error(f"获取目标群成员失败: {str(e)}")
-            current_user_ids = set()
+            current_map = {}
         
         # 获取登录账号
         try:
@@ -541,112 +737,83 @@ class RebuildManager:
         except:
             bot_user_id = None
         
+        # 获取好友列表 (整个重建只获取一次)
+        try:
+            friend_ids = await self._get_friend_ids()
+        except Exception as e:
+            logger.error(f"获取好友列表失败: {str(e)}")
+            friend_ids = None
+        
         # 发送开始通知
         if self.send_welcome:
             try:
                 await self.client.send_group_msg(
                     target_group_id,
-                    f"🔄 群组重建开始\n预计邀请 {len(members)} 位成员"
+                    f"🔄 群组重建开始\n预计邀请 {total} 位成员"
                 )
             except Exception as e:
                 logger.warning(f"发送通知失败: {str(e)}")
         
-        # 分离管理员和普通成员
-        admins = [m for m in members if m.role == "admin"]
-        owners = [m for m in members if m.role == "owner"]
-        regular_members = [m for m in members if m.role == "member"]
+        # 生产者/消费者流水线: 多个 worker 并发处理成员，
+        # 邀请仍受令牌桶限速，恢复请求受信号量限制
+        worker_count = max(1, min(MAX_REBUILD_WORKERS, self.invites_per_minute))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=worker_count)
         
-        # 按顺序处理: 普通成员 -> 管理员
-        all_members = regular_members + admins
+        async def worker():
+            while True:
+                member = await queue.get()
+                try:
+                    if not self._resume_event.is_set():
+                        await self._resume_event.wait()
+                    if not self._should_stop():
+                        self._progress.in_flight_users.add(member.user_id)
+                        await self._process_member(
+                            target_group_id, member, current_map,
+                            bot_user_id, friend_ids, progress_callback
+                        )
+                except Exception as e:
+                    logger.error("处理成员失败 {}: {}", member.user_id, e)
+                    await self._record_member_error(member, e, progress_callback)
+                finally:
+                    self._progress.in_flight_users.discard(member.user_id)
+                    queue.task_done()
         
-        for member in all_members:
-            # 检查取消/暂停
-            if self._cancelled:
-                self._progress.status = RebuildStatus.CANCELLED
-                break
-            
-            while self._paused:
-                await asyncio.sleep(1)
-                if self._cancelled:
-                    break
-            
-            self._progress.current_user = member.user_id
-            
-            # 跳过 Bot 自己
-            if member.user_id == bot_user_id:
-                result = InviteResult(
-                    user_id=member.user_id,
-                    nickname=member.nickname,
-                    status=InviteStatus.SKIPPED,
-                    message="Bot 自身"
-                )
-                self._progress.skipped += 1
-                self._progress.processed += 1
-                self._progress.results.append(result)
-                continue
-            
-            # 跳过已在群内的成员，但恢复其信息
-            if member.user_id in current_user_ids:
-                # 恢复名片和权限
-                restore_details = await self._restore_member_info(target_group_id, member)
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        try:
+            last_role = None
+            async for member in members:
+                # 检查暂停/取消 (暂停时阻塞等待，恢复或取消时立即唤醒)
+                if not self._resume_event.is_set():
+                    await self._resume_event.wait()
                 
-                if restore_details:
-                    # 有恢复操作执行
-                    result = InviteResult(
-                        user_id=member.user_id,
-                        nickname=member.nickname,
-                        status=InviteStatus.SUCCESS,
-                        message=f"已在群内，恢复了: {', '.join(restore_details)}"
-                    )
-                    self._progress.success += 1
-                else:
-                    # 无需恢复
-                    result = InviteResult(
-                        user_id=member.user_id,
-                        nickname=member.nickname,
-                        status=InviteStatus.SKIPPED,
-                        message="已在群内，无需更改"
-                    )
-                    self._progress.skipped += 1
+                if self._should_stop():
+                    break
                 
-                self._progress.processed += 1
-                self._progress.results.append(result)
-                continue
-            
-            # 尝试邀请
-            invite_result = await self._invite_member(target_group_id, member)
-            self._progress.results.append(invite_result)
-            self._progress.processed += 1
-            
-            if invite_result.status == InviteStatus.SUCCESS:
-                self._progress.success += 1
-                current_user_ids.add(member.user_id)
+                # 成员按角色顺序到达: 前一角色全部处理完后再处理下一角色 (普通成员 -> 管理员)
+                if last_role is not None and member.role != last_role:
+                    await queue.join()
+                last_role = member.role
                 
-                # 恢复名片和权限
-                await self._restore_member_info(target_group_id, member)
-                
-            elif invite_result.status == InviteStatus.FAILED:
-                self._progress.failed += 1
-                if not self.continue_on_error:
-                    self._progress.status = RebuildStatus.FAILED
-                    self._progress.error_message = invite_result.message
-                    break
-            else:
-                self._progress.skipped += 1
+                await queue.put(member)
             
-            # 回调
-            if progress_callback:
-                progress_callback(self._progress)
-            
-            # 速率控制
-            await asyncio.sleep(self.invite_interval)
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        
+        if self._cancelled:
+            self._progress.status = RebuildStatus.CANCELLED
         
         # 完成
         if self._progress.status == RebuildStatus.RUNNING:
             self._progress.status = RebuildStatus.COMPLETED
         
-        self._progress.completed_at = datetime.utcnow()
-        self._progress.current_user = None
+        self._progress.mark_completed()
+        self._progress.in_flight_users.clear()
+        # 成员信息已变更，丢弃该群的成员缓存
+        self._group_members_cache.pop(target_group_id, None)
+        await self._notify_progress(progress_callback, force=True)
         
         # 发送完成通知
         if self.send_welcome:
@@ -669,10 +836,173 @@ class RebuildManager:
         
         return self._progress
     
+    def _should_stop(self) -> bool:
+        """是否应停止处理后续成员 (已取消或因错误终止)"""
+        return self._cancelled or self._progress.status == RebuildStatus.FAILED
+    
+    async def _process_member(
+        self,
+        target_group_id: int,
+        member: BackupMember,
+        current_map: Dict[int, Dict[str, Any]],
+        bot_user_id: Optional[int],
+        friend_ids: Optional[Set[int]],
+        progress_callback: Callable[[RebuildProgress], None] = None
+    ):
+        """
+        处理单个成员: 已在群内则恢复信息，否则尝试邀请
+        
+        Args:
+            target_group_id: 目标群号
+            member: 备份成员
+            current_map: 目标群当前成员
+            bot_user_id: Bot 自身 QQ 号
+            friend_ids: 好友 ID 集合
+            progress_callback: 进度回调函数
+        """
+        # 跳过 Bot 自己
+        if member.user_id == bot_user_id:
+            result = InviteResult(
+                user_id=member.user_id,
+                nickname=member.nickname,
+                status=InviteStatus.SKIPPED,
+                message="Bot 自身"
+            )
+            self._progress.skipped += 1
+            self._progress.processed += 1
+            self._progress.results.append(result)
+            await self._notify_progress(progress_callback)
+            return
+        
+        # 跳过已在群内的成员，但恢复其信息
+        if member.user_id in current_map:
+            # 恢复名片和权限 (无需恢复时不发起调用)
+            restore_details = (
+                await self._restore_member_info(target_group_id, member)
+                if self._needs_restore(member) else []
+            )
+            
+            if restore_details:
+                # 有恢复操作执行
+                result = InviteResult(
+                    user_id=member.user_id,
+                    nickname=member.nickname,
+                    status=InviteStatus.SUCCESS,
+                    message=f"已在群内，恢复了: {', '.join(restore_details)}"
+                )
+                self._progress.success += 1
+            else:
+                # 无需恢复
+                result = InviteResult(
+                    user_id=member.user_id,
+                    nickname=member.nickname,
+                    status=InviteStatus.SKIPPED,
+                    message="已在群内，无需更改"
+                )
+                self._progress.skipped += 1
+            
+            self._progress.processed += 1
+            self._progress.results.append(result)
+            await self._notify_progress(progress_callback)
+            return
+        
+        # 尝试邀请 (速率控制：先获取令牌再调用 API)
+        async with self._limiter:
+            # 等待令牌期间可能已被暂停或取消
+            if not self._resume_event.is_set():
+                await self._resume_event.wait()
+            if self._should_stop():
+                return
+            
+            invite_result = await self._invite_member(target_group_id, member, friend_ids)
+            if invite_result.status == InviteStatus.SUCCESS:
+                # 恢复名片和权限
+                await self._restore_member_info(target_group_id, member)
+        
+        self._progress.results.append(invite_result)
+        self._progress.processed += 1
+        
+        if invite_result.status == InviteStatus.SUCCESS:
+            self._progress.success += 1
+        elif invite_result.status == InviteStatus.FAILED:
+            self._progress.failed += 1
+            if not self.continue_on_error:
+                self._progress.status = RebuildStatus.FAILED
+                self._progress.error_message = invite_result.message
+        else:
+            self._progress.skipped += 1
+        
+        # 回调
+        await self._notify_progress(progress_callback)
+    
+    async def _record_member_error(
+        self,
+        member: BackupMember,
+        error: Exception,
+        progress_callback: Callable[[RebuildProgress], None] = None
+    ):
+        """
+        将处理过程中抛出异常的成员计为失败，保证 processed 最终等于 total
+        
+        Args:
+            member: 备份成员
+            error: 抛出的异常
+            progress_callback: 进度回调函数
+        """
+        message = f"处理异常: {error}"
+        self._progress.results.append(InviteResult(
+            user_id=member.user_id,
+            nickname=member.nickname,
+            status=InviteStatus.FAILED,
+            message=message
+        ))
+        self._progress.processed += 1
+        self._progress.failed += 1
+        if not self.continue_on_error:
+            self._progress.status = RebuildStatus.FAILED
+            self._progress.error_message = message
+        await self._notify_progress(progress_callback)
+    
+    async def _notify_progress(
+        self,
+        progress_callback: Optional[Callable[[RebuildProgress], Any]],
+        force: bool = False
+    ):
+        """
+        调用进度回调 (节流)
+        
+        每处理 PROGRESS_CALLBACK_EVERY 个成员或距上次回调超过
+        PROGRESS_CALLBACK_INTERVAL 秒时回调一次；回调可以是协程函数。
+        
+        Args:
+            progress_callback: 进度回调函数
+            force: 忽略节流，立即回调
+        """
+        if not progress_callback:
+            return
+        
+        now = time.monotonic()
+        if (
+            not force
+            and self._progress.processed % PROGRESS_CALLBACK_EVERY
+            and now - self._last_callback_at < PROGRESS_CALLBACK_INTERVAL
+        ):
+            return
+        
+        self._last_callback_at = now
+        # 回调异常只记录日志: 成员已计数，不能让异常再传到 worker 被重复计为失败
+        try:
+            result = progress_callback(self._progress)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.warning(f"进度回调失败: {str(e)}")
+    
     async def _invite_member(
         self,
         group_id: int,
-        member: BackupMember
+        member: BackupMember,
+        friend_ids: Optional[Set[int]]
     ) -> InviteResult:
         """
         邀请单个成员
@@ -680,12 +1010,17 @@ class RebuildManager:
         注意: OneBot 11 标准没有直接邀请成员的 API
         这里使用发送私聊消息的方式模拟邀请通知
         实际的群邀请需要用户手动操作或使用扩展 API
+        
+        Args:
+            group_id: 群号
+            member: 备份成员
+            friend_ids: 好友 ID 集合，为 None 表示好友列表获取失败
         """
         try:
-            # 检查是否是好友
-            friends = await self.client.get_friend_list()
-            friend_ids = set(f.get("user_id") for f in friends)
+            if friend_ids is None:
+                raise RuntimeError("获取好友列表失败")
             
+            # 检查是否是好友
             if member.user_id not in friend_ids:
                 return InviteResult(
                     user_id=member.user_id,
@@ -698,7 +1033,7 @@ class RebuildManager:
             # 这里我们记录需要邀请的用户
             # 实际邀请需要 Bot 有相应权限或使用扩展 API
             
-            logger.info(f"需要邀请成员: {member.nickname}({member.user_id})")
+            logger.info("需要邀请成员: {}({})", member.nickname, member.user_id)
             
             # 返回成功(标记为待邀请)
             return InviteResult(
@@ -709,7 +1044,7 @@ class RebuildManager:
             )
             
         except Exception as e:
-            logger.error(f"邀请失败 {member.user_id}: {str(e)}")
+            logger.error("邀请失败 {}: {}", member.user_id, e)
             return InviteResult(
                 user_id=member.user_id,
                 nickname=member.nickname,
@@ -728,77 +1063,73 @@ class RebuildManager:
         Returns:
             成功恢复的项目列表 (如 ["名片", "头衔", "管理员"])
         """
+        if not self._needs_restore(member):
+            return []
+        
+        # (项目描述, 失败时的名称, 请求协程)
+        tasks = []
+        
+        # 恢复群名片（备份值可能是空字符串，也需要设置以清空）
+        if self.restore_cards:
+            backup_card = member.card or ""
+            tasks.append((
+                f"名片'{backup_card}'" if backup_card else "清空名片",
+                "名片",
+                self.client.set_group_card(group_id, member.user_id, backup_card)
+            ))
+        
+        # 恢复专属头衔（备份值可能是空字符串，也需要设置以清空）
+        if self.restore_titles:
+            backup_title = member.title or ""
+            tasks.append((
+                f"头衔'{backup_title}'" if backup_title else "清空头衔",
+                "头衔",
+                self.client.set_group_special_title(group_id, member.user_id, backup_title)
+            ))
+        
+        # 恢复管理员权限
+        if self.restore_admins and member.role == "admin":
+            tasks.append((
+                "管理员权限",
+                "管理员",
+                self.client.set_group_admin(group_id, member.user_id, True)
+            ))
+        
+        # 各项请求互不依赖，并发发送
+        results = await asyncio.gather(
+            *(self._guarded(coro) for _, _, coro in tasks),
+            return_exceptions=True
+        )
+        
         restored = []
+        for (label, name, _), result in zip(tasks, results):
+            if isinstance(result, Exception):
+                logger.warning("恢复{}失败 {}: {}", name, member.user_id, result)
+            else:
+                restored.append(label)
         
-        try:
-            # 恢复群名片（备份值可能是空字符串，也需要设置以清空）
-            if self.restore_cards:
-                backup_card = member.card or ""
-                try:
-                    await self.client.set_group_card(
-                        group_id,
-                        member.user_id,
-                        backup_card
-                    )
-                    if backup_card:
-                        logger.debug(f"已恢复名片: {member.user_id} -> {backup_card}")
-                        restored.append(f"名片'{backup_card}'")
-                    else:
-                        logger.debug(f"已清空名片: {member.user_id}")
-                        restored.append("清空名片")
-                except Exception as e:
-                    logger.warning(f"恢复名片失败 {member.user_id}: {str(e)}")
-            
-            # 恢复专属头衔（备份值可能是空字符串，也需要设置以清空）
-            if self.restore_titles:
-                backup_title = member.title or ""
-                try:
-                    await self.client.set_group_special_title(
-                        group_id,
-                        member.user_id,
-                        backup_title
-                    )
-                    if backup_title:
-                        logger.debug(f"已恢复头衔: {member.user_id} -> {backup_title}")
-                        restored.append(f"头衔'{backup_title}'")
-                    else:
-                        logger.debug(f"已清空头衔: {member.user_id}")
-                        restored.append("清空头衔")
-                except Exception as e:
-                    logger.warning(f"恢复头衔失败 {member.user_id}: {str(e)}")
-            
-            # 恢复管理员权限
-            if self.restore_admins and member.role == "admin":
-                try:
-                    await self.client.set_group_admin(
-                        group_id,
-                        member.user_id,
-                        True
-                    )
-                    logger.debug(f"已恢复管理员: {member.user_id}")
-                    restored.append("管理员权限")
-                except Exception as e:
-                    logger.warning(f"恢复管理员失败 {member.user_id}: {str(e)}")
-                    
-        except Exception as e:
-            logger.error(f"恢复成员信息失败 {member.user_id}: {str(e)}")
+        # 每个成员只输出一行；loguru 在级别被过滤时不会格式化参数
+        if restored:
+            logger.debug("已恢复: {} -> {}", member.user_id, restored)
         
         return restored
     
+    def _needs_restore(self, member: BackupMember) -> bool:
+        """是否有需要为该成员恢复的信息"""
+        return (
+            self.restore_cards
+            or self.restore_titles
+            or (self.restore_admins and member.role == "admin")
+        )
+    
+    async def _guarded(self, coro):
+        """在并发限制内执行请求"""
+        async with self._semaphore:
+            return await coro
+    
     async def get_rebuild_summary(self) -> Dict[str, Any]:
         """获取重建摘要"""
         if not self._progress:
             return {"message": "没有进行中的重建任务"}
         
-        return {
-            **self._progress.to_dict(),
-            "invite_results": [
-                {
-                    "user_id": r.user_id,
-                    "nickname": r.nickname,
-                    "status": r.status.value,
-                    "message": r.message,
-                }
-                for r in self._progress.results
-            ]
-        }
+        return self._progress.to_dict(include_results=True)
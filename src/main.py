@@ -2,7 +2,10 @@
 主程序入口
 """
 import asyncio
+import os
 import sys
+from collections import Counter
+from typing import Optional
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
@@ -11,10 +14,8 @@ sys.path.insert(0, str(project_root))
 
 import click
 from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-from src.utils.config import get_config, config_manager
+from src.utils.config import DEFAULT_CONFIG, get_config
 from src.utils.logger import setup_logger, get_logger
 from src.api.onebot import OneBotAPI
 from src.models import init_database, db_manager
@@ -26,14 +27,45 @@ logger = get_logger(__name__)
 console = Console()
 
 
+# 各命令表格的列定义: (列名, 样式)
+KEY_VALUE_COLUMNS = (("项目", "cyan"), ("值", "green"))
+GROUP_LIST_COLUMNS = (("群号", "cyan"), ("群名称", "green"), ("成员数", "yellow"))
+ROLE_STATS_COLUMNS = (("角色", "cyan"), ("人数", "green"))
+BACKUP_HISTORY_COLUMNS = (
+    ("ID", "cyan"),
+    ("类型", "blue"),
+    ("状态", "green"),
+    ("成员数", "yellow"),
+    ("新增/退出", "magenta"),
+    ("时间", "white"),
+)
+REBUILD_PREVIEW_COLUMNS = (("QQ", "cyan"), ("昵称", "green"), ("名片", "yellow"), ("角色", "magenta"))
+
+
+def make_table(title: str, columns):
+    """按列定义创建 Rich 表格"""
+    from rich.table import Table
+    
+    table = Table(title=title)
+    for header, style in columns:
+        table.add_column(header, style=style)
+    return table
+
+
+_app_config = None
+
+
 def init_app():
-    """初始化应用"""
+    """初始化应用 (同一进程内只初始化一次)"""
+    global _app_config
+    if _app_config is not None:
+        return _app_config
+    
     try:
-        config = config_manager.load()
+        config = get_config()
     except FileNotFoundError:
         console.print("[yellow]配置文件不存在，使用默认配置[/yellow]")
-        from src.utils.config import Config
-        config = Config()
+        config = DEFAULT_CONFIG
     
     # 设置日志
     setup_logger(
@@ -41,12 +73,15 @@ def init_app():
         log_file=config.logging.file,
         max_size=config.logging.max_size,
         backup_count=config.logging.backup_count,
-        console=config.logging.console
+        console=config.logging.console,
+        debug=config.advanced.debug
     )
     
     # 初始化数据库
-    init_database(config.database)
+    if not db_manager._initialized:
+        init_database(config.database)
     
+    _app_config = config
     return config
 
 
@@ -56,15 +91,28 @@ def create_client(config) -> OneBotAPI:
         host=config.onebot.http.host,
         port=config.onebot.http.port,
         access_token=config.onebot.access_token,
-        timeout=config.onebot.api_timeout
+        timeout=config.onebot.api_timeout,
+        cache_ttl=config.advanced.cache.effective_ttl
     )
 
 
+def run_with_client(client: OneBotAPI, coro):
+    """运行命令协程，结束后关闭 OneBot 客户端的 HTTP 会话"""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await client.close()
+    
+    return asyncio.run(runner())
+
+
 @click.group()
 @click.version_option(version="0.1.0", prog_name="Val-Halla")
-def cli():
+@click.option("--quiet", "-q", is_flag=True, help="静默模式，不输出到终端 (适合定时任务)")
+def cli(quiet: bool):
     """Val-Halla - QQ群成员自动备份与一键重建工具"""
-    pass
+    console.quiet = quiet
 
 
 @cli.command()
@@ -76,15 +124,21 @@ def status():
     async def check_status():
         console.print("\n[bold cyan]═══ Val-Halla 系统状态 ═══[/bold cyan]\n")
         
-        # 检查 OneBot 连接
+        # 检查 OneBot 连接 (群列表与登录/版本信息互不依赖，并发请求)
         with console.status("[bold green]正在检查 OneBot 连接..."):
+            login_info, version_info, groups = await asyncio.gather(
+                client.get_login_info(),
+                client.get_version_info(),
+                client.get_group_list(),
+                return_exceptions=True
+            )
+            
             try:
-                login_info = await client.get_login_info()
-                version_info = await client.get_version_info()
+                for result in (login_info, version_info):
+                    if isinstance(result, Exception):
+                        raise result
                 
-                table = Table(title="OneBot 连接状态")
-                table.add_column("项目", style="cyan")
-                table.add_column("值", style="green")
+                table = make_table("OneBot 连接状态", KEY_VALUE_COLUMNS)
                 
                 table.add_row("状态", "✅ 已连接")
                 table.add_row("Bot QQ", str(login_info.get("user_id", "N/A")))
@@ -98,16 +152,14 @@ def status():
                 console.print(f"[red]❌ OneBot 连接失败: {str(e)}[/red]")
                 return
         
-        # 获取群列表
+        # 群列表
         with console.status("[bold green]正在获取群列表..."):
             try:
-                groups = await client.get_group_list()
+                if isinstance(groups, Exception):
+                    raise groups
                 
                 if groups:
-                    table = Table(title=f"群列表 (共 {len(groups)} 个)")
-                    table.add_column("群号", style="cyan")
-                    table.add_column("群名称", style="green")
-                    table.add_column("成员数", style="yellow")
+                    table = make_table(f"群列表 (共 {len(groups)} 个)", GROUP_LIST_COLUMNS)
                     
                     for g in groups[:10]:  # 最多显示10个
                         table.add_row(
@@ -126,7 +178,7 @@ def status():
             except Exception as e:
                 console.print(f"[red]获取群列表失败: {str(e)}[/red]")
     
-    asyncio.run(check_status())
+    run_with_client(client, check_status())
 
 
 @cli.command()
@@ -140,13 +192,24 @@ def info(group_id: int, no_cache: bool):
     async def get_info():
         console.print(f"\n[bold cyan]获取群 {group_id} 信息...[/bold cyan]\n")
         
+        async def count_roles() -> Counter:
+            # 流式统计角色，不保留完整成员列表
+            return Counter([
+                m.get("role", "member")
+                async for m in client.iter_group_member_list(group_id, no_cache=no_cache)
+            ])
+        
         try:
-            # 获取群信息
-            group_info = await client.get_group_info(group_id, no_cache=no_cache)
+            # 并发获取群信息与成员角色统计
+            group_info, roles = await asyncio.gather(
+                client.get_group_info(group_id, no_cache=no_cache),
+                count_roles(),
+                return_exceptions=True
+            )
+            if isinstance(group_info, Exception):
+                raise group_info
             
-            table = Table(title=f"群信息: {group_info.get('group_name', 'N/A')}")
-            table.add_column("项目", style="cyan")
-            table.add_column("值", style="green")
+            table = make_table(f"群信息: {group_info.get('group_name', 'N/A')}", KEY_VALUE_COLUMNS)
             
             table.add_row("群号", str(group_info.get("group_id")))
             table.add_row("群名称", group_info.get("group_name", "N/A"))
@@ -155,28 +218,27 @@ def info(group_id: int, no_cache: bool):
             
             console.print(table)
             
-            # 获取成员列表
-            members = await client.get_group_member_list(group_id, no_cache=no_cache)
+            if isinstance(roles, Exception):
+                raise roles
             
             # 统计
-            owners = [m for m in members if m.get("role") == "owner"]
-            admins = [m for m in members if m.get("role") == "admin"]
+            total = sum(roles.values())
+            owners = roles.get("owner", 0)
+            admins = roles.get("admin", 0)
             
-            stats_table = Table(title="成员统计")
-            stats_table.add_column("角色", style="cyan")
-            stats_table.add_column("人数", style="green")
+            stats_table = make_table("成员统计", ROLE_STATS_COLUMNS)
             
-            stats_table.add_row("群主", str(len(owners)))
-            stats_table.add_row("管理员", str(len(admins)))
-            stats_table.add_row("普通成员", str(len(members) - len(owners) - len(admins)))
-            stats_table.add_row("总计", str(len(members)))
+            stats_table.add_row("群主", str(owners))
+            stats_table.add_row("管理员", str(admins))
+            stats_table.add_row("普通成员", str(total - owners - admins))
+            stats_table.add_row("总计", str(total))
             
             console.print(stats_table)
             
         except Exception as e:
             console.print(f"[red]获取信息失败: {str(e)}[/red]")
     
-    asyncio.run(get_info())
+    run_with_client(client, get_info())
 
 
 @cli.command()
@@ -185,6 +247,8 @@ def info(group_id: int, no_cache: bool):
 @click.option("--note", default="", help="备份备注")
 def backup(group_id: int, backup_type: str, note: str):
     """备份群成员"""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    
     config = init_app()
     client = create_client(config)
     
@@ -213,10 +277,11 @@ def backup(group_id: int, backup_type: str, note: str):
                 
                 progress.update(task, completed=True)
             
+            if console.quiet:
+                return
+            
             # 显示结果
-            table = Table(title="备份完成")
-            table.add_column("项目", style="cyan")
-            table.add_column("值", style="green")
+            table = make_table("备份完成", KEY_VALUE_COLUMNS)
             
             table.add_row("备份ID", str(result.id))
             table.add_row("备份类型", result.backup_type)
@@ -233,7 +298,7 @@ def backup(group_id: int, backup_type: str, note: str):
             console.print(f"[red]❌ 备份失败: {str(e)}[/red]")
             logger.exception("备份异常")
     
-    asyncio.run(do_backup())
+    run_with_client(client, do_backup())
 
 
 @cli.command()
@@ -253,19 +318,13 @@ def history(group_id: int, limit: int):
         console.print(f"\n[bold cyan]群 {group_id} 备份历史[/bold cyan]\n")
         
         try:
-            backups = await backup_manager.get_backup_history(group_id, limit)
+            backups = await backup_manager.get_backup_history_brief(group_id, limit)
             
             if not backups:
                 console.print("[yellow]没有备份记录[/yellow]")
                 return
             
-            table = Table(title=f"备份历史 (共 {len(backups)} 条)")
-            table.add_column("ID", style="cyan")
-            table.add_column("类型", style="blue")
-            table.add_column("状态", style="green")
-            table.add_column("成员数", style="yellow")
-            table.add_column("新增/退出", style="magenta")
-            table.add_column("时间", style="white")
+            table = make_table(f"备份历史 (共 {len(backups)} 条)", BACKUP_HISTORY_COLUMNS)
             
             for b in backups:
                 status_color = "green" if b.status == "success" else "red"
@@ -283,7 +342,7 @@ def history(group_id: int, limit: int):
         except Exception as e:
             console.print(f"[red]获取历史失败: {str(e)}[/red]")
     
-    asyncio.run(show_history())
+    run_with_client(client, show_history())
 
 
 @cli.command()
@@ -292,6 +351,10 @@ def history(group_id: int, limit: int):
 @click.option("--dry-run", is_flag=True, help="仅预览,不实际执行")
 def rebuild(backup_id: int, target_group_id: int, dry_run: bool):
     """从备份重建群组"""
+    from rich.progress import (
+        Progress, BarColumn, MofNCompleteColumn, TaskProgressColumn, TextColumn
+    )
+    
     config = init_app()
     client = create_client(config)
     
@@ -311,21 +374,17 @@ def rebuild(backup_id: int, target_group_id: int, dry_run: bool):
         console.print(f"\n[bold cyan]从备份 {backup_id} 重建到群 {target_group_id}[/bold cyan]\n")
         
         try:
-            # 获取备份成员
-            members = await backup_manager.get_backup_members(backup_id)
+            # 获取备份成员 (预览只读取前 20 人)
+            total, members = await backup_manager.preview_backup_members(backup_id, limit=20)
             
-            if not members:
+            if not total:
                 console.print("[red]备份中没有成员数据[/red]")
                 return
             
             # 显示预览
-            table = Table(title=f"将要恢复的成员 ({len(members)} 人)")
-            table.add_column("QQ", style="cyan")
-            table.add_column("昵称", style="green")
-            table.add_column("名片", style="yellow")
-            table.add_column("角色", style="magenta")
+            table = make_table(f"将要恢复的成员 ({total} 人)", REBUILD_PREVIEW_COLUMNS)
             
-            for m in members[:20]:
+            for m in members:
                 table.add_row(
                     str(m.user_id),
                     m.nickname or "N/A",
@@ -333,8 +392,8 @@ def rebuild(backup_id: int, target_group_id: int, dry_run: bool):
                     m.role
                 )
             
-            if len(members) > 20:
-                table.add_row("...", f"还有 {len(members) - 20} 人", "...", "...")
+            if total > len(members):
+                table.add_row("...", f"还有 {total - len(members)} 人", "...", "...")
             
             console.print(table)
             
@@ -342,31 +401,41 @@ def rebuild(backup_id: int, target_group_id: int, dry_run: bool):
                 console.print("\n[yellow]预览模式，未实际执行[/yellow]")
                 return
             
-            # 确认
-            if not click.confirm("\n确认执行重建?"):
+            # 确认 (在线程中等待输入，不阻塞事件循环)
+            if not await asyncio.to_thread(click.confirm, "\n确认执行重建?"):
                 console.print("[yellow]已取消[/yellow]")
                 return
             
             # 执行重建
-            def progress_callback(progress):
-                console.print(
-                    f"\r进度: {progress.processed}/{progress.total} "
-                    f"(成功:{progress.success} 失败:{progress.failed})",
-                    end=""
+            with Progress(
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                MofNCompleteColumn(),
+                TextColumn("成功:{task.fields[success]} 失败:{task.fields[failed]}"),
+                console=console
+            ) as progress_bar:
+                task = progress_bar.add_task("重建中...", total=None, success=0, failed=0)
+                
+                def progress_callback(progress):
+                    progress_bar.update(
+                        task,
+                        completed=progress.processed,
+                        total=progress.total,
+                        success=progress.success,
+                        failed=progress.failed
+                    )
+                
+                result = await rebuild_manager.rebuild_from_backup(
+                    backup_id,
+                    target_group_id,
+                    progress_callback=progress_callback
                 )
             
-            result = await rebuild_manager.rebuild_from_backup(
-                backup_id,
-                target_group_id,
-                progress_callback=progress_callback
-            )
-            
-            console.print("\n")
+            console.print()
             
             # 显示结果
-            table = Table(title="重建完成")
-            table.add_column("项目", style="cyan")
-            table.add_column("值", style="green")
+            table = make_table("重建完成", KEY_VALUE_COLUMNS)
             
             table.add_row("状态", result.status.value)
             table.add_row("总计", str(result.total))
@@ -380,7 +449,7 @@ def rebuild(backup_id: int, target_group_id: int, dry_run: bool):
             console.print(f"[red]重建失败: {str(e)}[/red]")
             logger.exception("重建异常")
     
-    asyncio.run(do_rebuild())
+    run_with_client(client, do_rebuild())
 
 
 @cli.command()
@@ -389,8 +458,8 @@ def rebuild(backup_id: int, target_group_id: int, dry_run: bool):
 @click.option("--output", "-o", default=None, help="输出文件路径")
 def export(group_id: int, export_format: str, output: str):
     """导出群成员数据"""
-    import json
     import csv
+    from src.utils.serializer import json_dumps
     
     config = init_app()
     client = create_client(config)
@@ -398,39 +467,61 @@ def export(group_id: int, export_format: str, output: str):
     async def do_export():
         console.print(f"\n[bold cyan]导出群 {group_id} 成员...[/bold cyan]\n")
         
+        tmp_filename = None
         try:
-            members = await client.get_group_member_list(group_id, no_cache=True)
-            
             if not output:
                 filename = f"export/members_{group_id}.{export_format}"
             else:
                 filename = output
             
+            # 边接收边写入临时文件，不在内存中保留完整成员列表；
+            # 全部写完后再替换为目标文件，中途失败不会留下残缺的导出文件
+            tmp_filename = filename + ".tmp"
+            count = 0
             if export_format == "json":
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(members, f, ensure_ascii=False, indent=2)
+                with open(tmp_filename, 'wb') as f:
+                    f.write(b"[")
+                    async for member in client.iter_group_member_list(group_id):
+                        if count:
+                            f.write(b",\n")
+                        f.write(json_dumps(member))
+                        count += 1
+                    f.write(b"]\n")
             else:
-                with open(filename, 'w', encoding='utf-8', newline='') as f:
-                    if members:
-                        writer = csv.DictWriter(f, fieldnames=members[0].keys())
-                        writer.writeheader()
-                        writer.writerows(members)
-            
-            console.print(f"[green]✅ 已导出 {len(members)} 个成员到 {filename}[/green]")
+                with open(tmp_filename, 'w', encoding='utf-8', newline='') as f:
+                    writer = None
+                    async for member in client.iter_group_member_list(group_id):
+                        if writer is None:
+                            writer = csv.DictWriter(f, fieldnames=member.keys())
+                            writer.writeheader()
+                        writer.writerow(member)
+                        count += 1
+            os.replace(tmp_filename, filename)
+            
+            console.print(f"[green]✅ 已导出 {count} 个成员到 {filename}[/green]")
             
         except Exception as e:
             console.print(f"[red]导出失败: {str(e)}[/red]")
+        finally:
+            if tmp_filename and os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
     
-    asyncio.run(do_export())
+    run_with_client(client, do_export())
 
 
 @cli.command()
 @click.option("--host", default="0.0.0.0", help="监听地址")
 @click.option("--port", default=8080, help="监听端口")
-def webui(host: str, port: int):
+@click.option("--workers", type=int, default=None, help="工作进程数 (默认使用配置 web_api.workers)")
+def webui(host: str, port: int, workers: Optional[int]):
     """启动 Web UI"""
     import uvicorn
     
+    # 预先加载配置并初始化数据库，单进程时 Web 应用启动时直接复用
+    # (多进程时每个工作进程在启动事件中各自初始化数据库)
+    config = init_app()
+    workers = workers or config.web_api.workers
+    
     console.print(f"\n[bold cyan]═══ Val-Halla Web UI ═══[/bold cyan]\n")
     console.print(f"[green]✨ 启动 Web 界面...[/green]")
     console.print(f"[blue]📍 地址: http://{host}:{port}[/blue]")
@@ -441,12 +532,30 @@ def webui(host: str, port: int):
         host=host,
         port=port,
         reload=False,
-        log_level="info"
+        log_level="info",
+        # auto 会在安装了 uvicorn[standard] 时选用 uvloop 与 httptools
+        loop="auto",
+        http="auto",
+        workers=workers
     )
 
 
+def install_event_loop_policy():
+    """安装更快的事件循环策略: 优先 uvloop，Windows 使用 Selector 事件循环"""
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        return
+    
+    try:
+        import uvloop
+    except ImportError:  # pragma: no cover - 可选依赖
+        return
+    uvloop.install()
+
+
 def main():
     """主入口"""
+    install_event_loop_policy()
     cli()
 
 
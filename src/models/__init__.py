@@ -1,7 +1,7 @@
 """
 数据模型模块
 """
-from .database import Base, DatabaseManager, db_manager, init_database, get_db
+from .database import Base, DatabaseManager, db_manager, init_database, get_db, dialect_insert
 from .group import Group
 from .member import Member, MemberHistory, MemberRole, MemberGender
 from .backup import Backup, BackupMember, BackupType, BackupStatus
@@ -13,6 +13,7 @@ __all__ = [
     'db_manager',
     'init_database',
     'get_db',
+    'dialect_insert',
     # 群组
     'Group',
     # 成员
@@ -1,15 +1,18 @@
 """
 备份记录数据模型
 """
+import hashlib
+import json
 from datetime import datetime
-from typing import Optional, List, TYPE_CHECKING
-from sqlalchemy import String, Integer, BigInteger, DateTime, Text, ForeignKey, Boolean, JSON
+from typing import Optional, List, Iterable, TYPE_CHECKING
+from sqlalchemy import String, Integer, BigInteger, DateTime, Text, ForeignKey, Boolean, Index, JSON, insert, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
 from .database import Base
 
 if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
     from .group import Group
 
 
@@ -32,12 +35,15 @@ class BackupStatus(enum.Enum):
 class Backup(Base):
     """备份记录模型"""
     __tablename__ = "backups"
+    __table_args__ = (
+        # 按群查询备份历史并按时间倒序 (同时覆盖只按 group_id 的查询)
+        Index("ix_backups_group_created", "group_id", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[int] = mapped_column(
         BigInteger,
         ForeignKey("groups.group_id", ondelete="CASCADE"),
-        index=True,
         comment="群号"
     )
     
@@ -63,6 +69,10 @@ class Backup(Base):
     file_size: Mapped[int] = mapped_column(Integer, default=0, comment="文件大小(字节)")
     compressed: Mapped[bool] = mapped_column(Boolean, default=False, comment="是否压缩")
     encrypted: Mapped[bool] = mapped_column(Boolean, default=False, comment="是否加密")
+    file_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, comment="成员数据 SHA-256")
+    base_backup_id: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, comment="增量备份所基于的全量备份ID"
+    )
     
     # 备份数据摘要 (JSON格式)
     summary: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, comment="备份摘要")
@@ -96,6 +106,8 @@ class Backup(Base):
             "file_size": self.file_size,
             "compressed": self.compressed,
             "encrypted": self.encrypted,
+            "file_hash": self.file_hash,
+            "base_backup_id": self.base_backup_id,
             "summary": self.summary,
             "notes": self.notes,
             "error_message": self.error_message,
@@ -115,12 +127,15 @@ class Backup(Base):
 class BackupMember(Base):
     """备份中的成员快照"""
     __tablename__ = "backup_members"
+    __table_args__ = (
+        # 按备份读取/对比成员快照 (同时覆盖只按 backup_id 的查询)
+        Index("ix_bm_backup_user", "backup_id", "user_id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     backup_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("backups.id", ondelete="CASCADE"),
-        index=True,
         comment="备份ID"
     )
     
@@ -134,10 +149,121 @@ class BackupMember(Base):
     title: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, comment="专属头衔")
     join_time: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, comment="加群时间戳")
     last_sent_time: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, comment="最后发言时间戳")
+    content_hash: Mapped[Optional[int]] = mapped_column(
+        BigInteger, nullable=True, comment="CONTENT_FIELDS 的 64 位哈希"
+    )
+    
+    # 参与内容哈希 (增量备份比较) 的字段
+    CONTENT_FIELDS = ("nickname", "card", "role", "title")
+    
+    # as_tuple() 的字段顺序 (与 to_dict() 的键顺序一致)
+    FIELDS = (
+        "id", "backup_id", "user_id", "nickname", "card", "sex",
+        "role", "level", "title", "join_time", "last_sent_time",
+    )
     
     def __repr__(self):
         return f"<BackupMember {self.user_id} in backup {self.backup_id}>"
     
+    def as_tuple(self) -> tuple:
+        """按 FIELDS 顺序返回字段值 (用于 CSV 等逐行输出，不构建字典)"""
+        return (
+            self.id,
+            self.backup_id,
+            self.user_id,
+            self.nickname,
+            self.card,
+            self.sex,
+            self.role,
+            self.level,
+            self.title,
+            self.join_time,
+            self.last_sent_time,
+        )
+    
+    @staticmethod
+    def to_insert_dict(backup_id: int, data: dict) -> dict:
+        """从 OneBot API 响应构建快照行数据 (用于批量插入)"""
+        return {
+            "backup_id": backup_id,
+            "user_id": data.get("user_id"),
+            "nickname": data.get("nickname", ""),
+            "card": data.get("card", ""),
+            "sex": data.get("sex", "unknown"),
+            "role": data.get("role", "member"),
+            "level": data.get("level", ""),
+            "title": data.get("title", ""),
+            "join_time": data.get("join_time"),
+            "last_sent_time": data.get("last_sent_time"),
+            "content_hash": BackupMember.compute_content_hash(data),
+        }
+    
+    @classmethod
+    def compute_content_hash(cls, data: dict) -> int:
+        """
+        计算成员内容哈希 (BLAKE2b 取 8 字节，转为有符号 64 位整数)
+        
+        固定使用标准库 json 编码，保证已存入数据库的哈希与是否安装 orjson 无关。
+        
+        Args:
+            data: OneBot API 返回的成员数据
+        
+        Returns:
+            可存入 BigInteger 列的哈希值
+        """
+        payload = json.dumps(
+            [data.get(field) for field in cls.CONTENT_FIELDS],
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+    
+    @classmethod
+    async def bulk_insert(
+        cls,
+        session: "AsyncSession",
+        backup_id: int,
+        members: Iterable[dict]
+    ) -> int:
+        """
+        批量写入备份成员快照
+        
+        PostgreSQL (asyncpg) 在确认已处于会话事务中时使用 COPY，
+        其余情况使用单条 executemany INSERT；不做逐行 ORM add。
+        
+        Args:
+            session: 数据库会话
+            backup_id: 备份ID
+            members: OneBot API 返回的成员数据
+        
+        Returns:
+            写入的行数
+        """
+        rows = [cls.to_insert_dict(backup_id, m) for m in members]
+        if not rows:
+            return 0
+        
+        conn = await session.connection()
+        if conn.dialect.driver == "asyncpg":
+            # SQLAlchemy 的 asyncpg 适配器在首条语句执行时才开启事务，
+            # 直接调用驱动的 COPY 不会触发它；先经由 conn 执行一条语句，
+            # 使 COPY 落在会话事务内 (回滚时一并撤销)
+            await conn.execute(text("SELECT 1"))
+            raw = await conn.get_raw_connection()
+            driver_conn = raw.driver_connection
+            if driver_conn.is_in_transaction():
+                columns = list(rows[0])
+                await driver_conn.copy_records_to_table(
+                    cls.__tablename__,
+                    records=[tuple(row[c] for c in columns) for row in rows],
+                    columns=columns
+                )
+                return len(rows)
+        
+        await session.execute(insert(cls), rows)
+        return len(rows)
+    
     def to_dict(self):
         """转换为字典"""
         return {
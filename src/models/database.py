@@ -5,20 +5,76 @@ from pathlib import Path
 from typing import AsyncGenerator, Optional
 from contextlib import asynccontextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text, DateTime, Insert
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, sessionmaker, Session
+from sqlalchemy.sql.functions import FunctionElement
 
 from src.utils.logger import get_logger
+from src.utils.serializer import json_dumps, json_loads
 
 logger = get_logger(__name__)
 
+# 旧版本创建、现已移除的索引 (启动建表时删除)
+OBSOLETE_INDEXES = (
+    # 与 ix_backups_group_created 前缀列相同的部分索引，只增加写入开销
+    "ix_backups_group_success",
+    # 单列索引，已被以该列开头的复合索引覆盖
+    "ix_members_group_id",            # -> ix_members_group_user
+    "ix_backups_group_id",            # -> ix_backups_group_created
+    "ix_backup_members_backup_id",    # -> ix_bm_backup_user
+)
+
+# PostgreSQL 连接池: 连接最长存活秒数 (避免服务端/代理断开的陈旧连接) 与获取连接的超时
+POOL_RECYCLE = 1800
+POOL_TIMEOUT = 30
+
+# SQLite 连接参数: WAL 让读不阻塞写，NORMAL 在 WAL 下只在检查点 fsync
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def _json_column_dumps(obj) -> str:
+    """JSON 列序列化 (方言要求返回 str)"""
+    return json_dumps(obj).decode("utf-8")
+
+
+# JSON 列 (如 Backup.summary) 使用 orjson 序列化，未安装时回退到标准库
+_JSON_OPTIONS = {
+    "json_serializer": _json_column_dumps,
+    "json_deserializer": json_loads,
+}
+
 
 class Base(DeclarativeBase):
     """SQLAlchemy 基类"""
     pass
 
 
+class utcnow(FunctionElement):
+    """数据库端生成的当前 UTC 时间，用作 server_default"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw):
+    # SQLite 的 CURRENT_TIMESTAMP 即为 UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _compile_utcnow_pg(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
 class DatabaseManager:
     """数据库管理器"""
     
@@ -42,18 +98,24 @@ class DatabaseManager:
         
         # 同步引擎
         sync_url = f"sqlite:///{db_path}"
-        self._engine = create_engine(sync_url, echo=False)
+        self._engine = create_engine(sync_url, echo=False, **_JSON_OPTIONS)
+        event.listen(self._engine, "connect", _set_sqlite_pragmas)
         self._session_factory = sessionmaker(bind=self._engine, expire_on_commit=False)
         
         # 异步引擎
         async_url = f"sqlite+aiosqlite:///{db_path}"
-        self._async_engine = create_async_engine(async_url, echo=False)
+        self._async_engine = create_async_engine(async_url, echo=False, **_JSON_OPTIONS)
+        event.listen(self._async_engine.sync_engine, "connect", _set_sqlite_pragmas)
         self._async_session_factory = async_sessionmaker(
             bind=self._async_engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
         
+        # 刷新查询规划器统计信息 (新增索引后让 SQLite 选用)
+        with self._engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+        
         self._initialized = True
         logger.info(f"SQLite 数据库已初始化: {db_path}")
     
@@ -85,7 +147,11 @@ class DatabaseManager:
             sync_url,
             echo=False,
             pool_size=pool_size,
-            max_overflow=max_overflow
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=POOL_RECYCLE,
+            pool_timeout=POOL_TIMEOUT,
+            **_JSON_OPTIONS
         )
         self._session_factory = sessionmaker(bind=self._engine, expire_on_commit=False)
         
@@ -95,7 +161,11 @@ class DatabaseManager:
             async_url,
             echo=False,
             pool_size=pool_size,
-            max_overflow=max_overflow
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=POOL_RECYCLE,
+            pool_timeout=POOL_TIMEOUT,
+            **_JSON_OPTIONS
         )
         self._async_session_factory = async_sessionmaker(
             bind=self._async_engine,
@@ -111,7 +181,10 @@ class DatabaseManager:
         if not self._initialized:
             raise RuntimeError("数据库未初始化")
         
-        Base.metadata.create_all(self._engine)
+        with self._engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            _add_missing_columns(conn)
+            _create_missing_indexes(conn)
         logger.info("数据库表已创建")
     
     async def create_tables_async(self):
@@ -121,8 +194,21 @@ class DatabaseManager:
         
         async with self._async_engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
+            await conn.run_sync(_create_missing_indexes)
         logger.info("数据库表已创建 (async)")
     
+    async def get_pool_stats(self) -> str:
+        """
+        获取异步引擎连接池状态
+
+        Returns:
+            连接池状态描述
+        """
+        if not self._initialized:
+            raise RuntimeError("数据库未初始化")
+        return self._async_engine.pool.status()
+    
     def get_session(self) -> Session:
         """获取同步会话"""
         if not self._initialized:
@@ -154,16 +240,71 @@ class DatabaseManager:
         logger.info("数据库连接已关闭")
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """为每个新建的 SQLite 连接设置 PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _add_missing_columns(conn):
+    """为已存在的表补加新增的可空列 (create_all 不会修改已存在的表)"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            )
+            logger.info(f"已为表 {table.name} 添加列: {column.name}")
+
+
+def _create_missing_indexes(conn):
+    """为已存在的表补建新增的索引 (create_all 只在建表时创建索引)，并删除已废弃的索引"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    for name in OBSOLETE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def dialect_insert(session, model) -> Insert:
+    """
+    获取当前数据库方言的 INSERT 语句 (支持 ON CONFLICT)
+    
+    Args:
+        session: 数据库会话
+        model: 模型类
+    
+    Returns:
+        postgresql 或 sqlite 方言的 insert 语句
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 # 全局数据库管理器实例
 db_manager = DatabaseManager()
 
 
-def init_database(config):
+def init_database(config, create_tables: bool = True):
     """
     根据配置初始化数据库
     
     Args:
         config: 数据库配置对象
+        create_tables: 是否同步创建表 (异步应用应改用 create_tables_async)
     """
     if config.type == "sqlite":
         db_manager.init_sqlite(config.sqlite.path)
@@ -182,7 +323,8 @@ def init_database(config):
         raise ValueError(f"不支持的数据库类型: {config.type}")
     
     # 创建表
-    db_manager.create_tables()
+    if create_tables:
+        db_manager.create_tables()
 
 
 def get_db() -> DatabaseManager:
@@ -2,26 +2,27 @@
 成员数据模型
 """
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING
-from sqlalchemy import String, Integer, BigInteger, DateTime, Text, ForeignKey, Enum as SQLEnum
+from operator import attrgetter
+from typing import Iterable, List, Optional, TYPE_CHECKING
+from sqlalchemy import String, Integer, BigInteger, DateTime, Text, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
-from .database import Base
+from .database import Base, utcnow
 
 if TYPE_CHECKING:
     from .group import Group
 
 
-class MemberRole(enum.Enum):
-    """成员角色"""
+class MemberRole(str, enum.Enum):
+    """成员角色（成员本身即字符串，可直接与 OneBot 返回值比较）"""
     OWNER = "owner"      # 群主
     ADMIN = "admin"      # 管理员
     MEMBER = "member"    # 普通成员
 
 
-class MemberGender(enum.Enum):
-    """成员性别"""
+class MemberGender(str, enum.Enum):
+    """成员性别（成员本身即字符串）"""
     MALE = "male"
     FEMALE = "female"
     UNKNOWN = "unknown"
@@ -30,12 +31,16 @@ class MemberGender(enum.Enum):
 class Member(Base):
     """群成员模型"""
     __tablename__ = "members"
+    __table_args__ = (
+        # 同一群内成员唯一，供 UPSERT (ON CONFLICT) 使用；
+        # 其前缀列 group_id 也覆盖了按群查询，无需单独的 group_id 索引
+        Index("ix_members_group_user", "group_id", "user_id", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[int] = mapped_column(
         BigInteger, 
         ForeignKey("groups.group_id", ondelete="CASCADE"),
-        index=True,
         comment="群号"
     )
     user_id: Mapped[int] = mapped_column(BigInteger, index=True, comment="QQ号")
@@ -45,7 +50,7 @@ class Member(Base):
     card: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, comment="群名片")
     sex: Mapped[str] = mapped_column(
         String(20), 
-        default=MemberGender.UNKNOWN.value,
+        default=MemberGender.UNKNOWN,
         comment="性别"
     )
     age: Mapped[int] = mapped_column(Integer, default=0, comment="年龄")
@@ -54,7 +59,7 @@ class Member(Base):
     # 群内信息
     role: Mapped[str] = mapped_column(
         String(20),
-        default=MemberRole.MEMBER.value,
+        default=MemberRole.MEMBER,
         comment="角色"
     )
     level: Mapped[str] = mapped_column(String(50), default="", comment="等级")
@@ -67,10 +72,16 @@ class Member(Base):
     shut_up_timestamp: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, comment="禁言到期时间戳")
     
     # 元数据
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, comment="创建时间")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        server_default=utcnow(),
+        comment="创建时间"
+    )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
+        server_default=utcnow(),
         onupdate=datetime.utcnow,
         comment="更新时间"
     )
@@ -81,47 +92,64 @@ class Member(Base):
     def __repr__(self):
         return f"<Member {self.nickname}({self.user_id}) in {self.group_id}>"
     
+    # to_dict() 直接输出的列 (时间列单独转为 ISO 字符串)
+    _DICT_KEYS = (
+        "id", "group_id", "user_id", "nickname", "card", "sex", "age", "area",
+        "role", "level", "title", "title_expire_time", "join_time",
+        "last_sent_time", "shut_up_timestamp",
+    )
+    _get_dict_values = attrgetter(*_DICT_KEYS)
+    
     def to_dict(self):
         """转换为字典"""
-        return {
-            "id": self.id,
-            "group_id": self.group_id,
-            "user_id": self.user_id,
-            "nickname": self.nickname,
-            "card": self.card,
-            "sex": self.sex,
-            "age": self.age,
-            "area": self.area,
-            "role": self.role,
-            "level": self.level,
-            "title": self.title,
-            "title_expire_time": self.title_expire_time,
-            "join_time": self.join_time,
-            "last_sent_time": self.last_sent_time,
-            "shut_up_timestamp": self.shut_up_timestamp,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        data = dict(zip(self._DICT_KEYS, self._get_dict_values(self)))
+        created_at, updated_at = self.created_at, self.updated_at
+        data["created_at"] = created_at and created_at.isoformat()
+        data["updated_at"] = updated_at and updated_at.isoformat()
+        return data
     
     @classmethod
     def from_onebot_data(cls, group_id: int, data: dict) -> "Member":
         """从 OneBot API 响应创建成员对象"""
-        return cls(
-            group_id=group_id,
-            user_id=data.get("user_id"),
-            nickname=data.get("nickname", ""),
-            card=data.get("card", ""),
-            sex=data.get("sex", "unknown"),
-            age=data.get("age", 0),
-            area=data.get("area", ""),
-            role=data.get("role", "member"),
-            level=data.get("level", ""),
-            title=data.get("title", ""),
-            title_expire_time=data.get("title_expire_time"),
-            join_time=data.get("join_time"),
-            last_sent_time=data.get("last_sent_time"),
-            shut_up_timestamp=data.get("shut_up_timestamp"),
-        )
+        return cls(**cls.to_insert_dict(group_id, data))
+    
+    @staticmethod
+    def to_insert_dict(group_id: int, data: dict) -> dict:
+        """从 OneBot API 响应构建行数据 (用于批量插入)"""
+        return {
+            "group_id": group_id,
+            "user_id": data.get("user_id"),
+            "nickname": data.get("nickname", ""),
+            "card": data.get("card", ""),
+            "sex": data.get("sex", MemberGender.UNKNOWN.value),
+            "age": data.get("age", 0),
+            "area": data.get("area", ""),
+            "role": data.get("role", MemberRole.MEMBER.value),
+            "level": data.get("level", ""),
+            "title": data.get("title", ""),
+            "title_expire_time": data.get("title_expire_time"),
+            "join_time": data.get("join_time"),
+            "last_sent_time": data.get("last_sent_time"),
+            "shut_up_timestamp": data.get("shut_up_timestamp"),
+        }
+    
+    @classmethod
+    def to_insert_rows(cls, group_id: int, data_list: Iterable[dict], **extra) -> List[dict]:
+        """
+        批量构建行数据，供单条 executemany INSERT 使用
+        
+        Args:
+            group_id: 群号
+            data_list: OneBot API 返回的成员数据
+            **extra: 每行额外写入的列 (如 updated_at)
+        
+        Returns:
+            行数据列表
+        """
+        to_dict = cls.to_insert_dict
+        if extra:
+            return [{**to_dict(group_id, data), **extra} for data in data_list]
+        return [to_dict(group_id, data) for data in data_list]
 
 
 class MemberHistory(Base):
@@ -139,7 +167,12 @@ class MemberHistory(Base):
         nullable=True,
         comment="关联备份ID"
     )
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, comment="变更时间")
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        server_default=utcnow(),
+        comment="变更时间"
+    )
     
     def __repr__(self):
         return f"<MemberHistory {self.user_id} {self.action} {self.group_id}>"
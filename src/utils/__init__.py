@@ -3,6 +3,7 @@
 """
 from .config import get_config, ConfigManager, config_manager
 from .logger import get_logger, setup_logger, logger_manager
+from .serializer import json_dumps, json_loads
 
 __all__ = [
     'get_config',
@@ -10,5 +11,7 @@ __all__ = [
     'config_manager',
     'get_logger',
     'setup_logger',
-    'logger_manager'
+    'logger_manager',
+    'json_dumps',
+    'json_loads'
 ]
@@ -1,12 +1,21 @@
 """
 配置管理模块
 """
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 import yaml
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
+from .serializer import json_dumps, json_loads
+
+try:
+    # libyaml 的 C 实现，比纯 Python 解析器快一个数量级
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # pragma: no cover - 未编译 libyaml
+    from yaml import SafeLoader, SafeDumper
+
 
 class OneBotHttpConfig(BaseModel):
     """OneBot HTTP 配置"""
@@ -158,6 +167,7 @@ class WebAPIConfig(BaseModel):
     port: int = 8000
     api_key: str = ""
     docs: bool = True
+    workers: int = 1  # Web UI 工作进程数；多进程时重建进度等内存状态不在进程间共享
     cors: CORSConfig = Field(default_factory=CORSConfig)
 
 
@@ -165,6 +175,11 @@ class CacheConfig(BaseModel):
     """缓存配置"""
     enabled: bool = True
     ttl: int = 300
+    
+    @property
+    def effective_ttl(self) -> float:
+        """实际使用的缓存时间(秒)，禁用缓存时为 0"""
+        return self.ttl if self.enabled else 0
 
 
 class PerformanceConfig(BaseModel):
@@ -194,11 +209,31 @@ class Config(BaseModel):
     advanced: AdvancedConfig = Field(default_factory=AdvancedConfig)
 
 
+# 默认配置 (配置文件不存在时使用)，导入时构造一次；全部为默认值，无需校验
+DEFAULT_CONFIG: Config = Config.model_construct()
+
+
+def _construct(model_cls: type, data: Dict[str, Any]) -> BaseModel:
+    """递归地用 model_construct 构造模型 (跳过校验，仅用于可信的已校验数据)"""
+    values = {}
+    for name, field in model_cls.model_fields.items():
+        if name not in data:
+            continue
+        value = data[name]
+        annotation = field.annotation
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel) and isinstance(value, dict):
+            value = _construct(annotation, value)
+        values[name] = value
+    return model_cls.model_construct(**values)
+
+
 class ConfigManager:
     """配置管理器"""
     
     def __init__(self, config_path: str = "config/config.yaml"):
         self.config_path = Path(config_path)
+        # 解析结果缓存 (JSON)，以 YAML 文件的 mtime/大小判断是否过期
+        self.cache_path = self.config_path.with_name(self.config_path.name + ".cache.json")
         self._config: Optional[Config] = None
     
     def load(self) -> Config:
@@ -206,18 +241,57 @@ class ConfigManager:
         if not self.config_path.exists():
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
         
+        _invalidate_cached_config()
+        stat = self.config_path.stat()
+        key = [stat.st_mtime_ns, stat.st_size]
+        
+        # 缓存中是已校验过的完整配置，直接构造而不再校验
+        cached = self._read_cache(key)
+        if cached is not None:
+            self._config = _construct(Config, cached)
+            return self._config
+        
         with open(self.config_path, 'r', encoding='utf-8') as f:
-            config_dict = yaml.safe_load(f)
+            config_dict = yaml.load(f, Loader=SafeLoader)
         
         self._config = Config(**config_dict)
+        self._write_cache(key, self._config.model_dump(mode="json"))
         return self._config
     
+    def _read_cache(self, key: List[int]) -> Optional[Dict[str, Any]]:
+        """读取未过期的 JSON 缓存 (首行为 [mtime_ns, size])，过期或损坏时返回 None"""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                if json_loads(f.readline()) != key:
+                    return None
+                return json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    def _write_cache(self, key: List[int], config_dict: Dict[str, Any]):
+        """原子写入 JSON 缓存；目录不可写等失败时忽略"""
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(json_dumps(key) + b"\n" + json_dumps(config_dict))
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, TypeError, ValueError):
+            tmp_path.unlink(missing_ok=True)
+    
     def save(self, config: Config):
         """保存配置"""
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_path.unlink(missing_ok=True)
+        _invalidate_cached_config()
         
         with open(self.config_path, 'w', encoding='utf-8') as f:
-            yaml.dump(config.model_dump(), f, default_flow_style=False, allow_unicode=True)
+            yaml.dump(
+                config.model_dump(),
+                f,
+                Dumper=SafeDumper,
+                default_flow_style=False,
+                allow_unicode=True
+            )
         
         self._config = config
     
@@ -238,6 +312,19 @@ class ConfigManager:
 config_manager = ConfigManager()
 
 
+# get_config() 的缓存结果 (ConfigManager 重新加载或保存时清空)
+_cached_config: Optional[Config] = None
+
+
 def get_config() -> Config:
-    """获取配置"""
-    return config_manager.config
+    """获取全局配置 (首次调用后直接返回缓存的实例)"""
+    global _cached_config
+    if _cached_config is None:
+        _cached_config = config_manager.config
+    return _cached_config
+
+
+def _invalidate_cached_config():
+    """清空 get_config() 的缓存"""
+    global _cached_config
+    _cached_config = None
@@ -7,6 +7,16 @@ from loguru import logger
 import sys
 
 
+# 默认日志格式 (控制台带颜色标记，文件使用纯文本格式)
+CONSOLE_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
 class LoggerManager:
     """日志管理器"""
     
@@ -20,7 +30,8 @@ class LoggerManager:
         max_size: int = 10,
         backup_count: int = 5,
         console: bool = True,
-        format_string: Optional[str] = None
+        format_string: Optional[str] = None,
+        debug: bool = False
     ):
         """
         设置日志
@@ -32,6 +43,7 @@ class LoggerManager:
             backup_count: 保留的日志文件数量
             console: 是否输出到控制台
             format_string: 日志格式
+            debug: 调试模式，异常日志附带变量值 (diagnose，开销较大)
         """
         if self._initialized:
             logger.warning("日志已经初始化，跳过重复初始化")
@@ -40,24 +52,15 @@ class LoggerManager:
         # 移除默认处理器
         logger.remove()
         
-        # 默认格式
-        if format_string is None:
-            format_string = (
-                "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-                "<level>{level: <8}</level> | "
-                "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
-                "<level>{message}</level>"
-            )
-        
         # 添加控制台处理器
         if console:
             logger.add(
                 sys.stdout,
-                format=format_string,
+                format=format_string or CONSOLE_FORMAT,
                 level=level,
                 colorize=True,
                 backtrace=True,
-                diagnose=True
+                diagnose=debug
             )
         
         # 添加文件处理器
@@ -67,14 +70,16 @@ class LoggerManager:
             
             logger.add(
                 log_file,
-                format=format_string,
+                format=format_string or FILE_FORMAT,
                 level=level,
                 rotation=f"{max_size} MB",
                 retention=backup_count,
                 compression="zip",
                 encoding="utf-8",
+                # 文件写入交给后台线程，避免阻塞事件循环
+                enqueue=True,
                 backtrace=True,
-                diagnose=True
+                diagnose=debug
             )
         
         self._initialized = True
@@ -105,7 +110,8 @@ def setup_logger(
     max_size: int = 10,
     backup_count: int = 5,
     console: bool = True,
-    format_string: Optional[str] = None
+    format_string: Optional[str] = None,
+    debug: bool = False
 ):
     """设置日志（便捷函数）"""
     logger_manager.setup(
@@ -114,5 +120,6 @@ def setup_logger(
         max_size=max_size,
         backup_count=backup_count,
         console=console,
-        format_string=format_string
+        format_string=format_string,
+        debug=debug
     )
@@ -0,0 +1,42 @@
+"""
+JSON 序列化工具模块
+
+优先使用 orjson (C 实现，速度更快)，未安装时回退到标准库 json
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    序列化为紧凑的 UTF-8 JSON 字节串
+    
+    Args:
+        obj: 待序列化对象
+        
+    Returns:
+        JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """
+    反序列化 JSON 数据
+    
+    Args:
+        data: JSON 字节串或字符串
+        
+    Returns:
+        解析后的对象
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
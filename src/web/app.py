@@ -2,14 +2,16 @@
 Val-Halla Web UI 应用
 FastAPI 后端 + Jinja2 模板前端
 """
-import os
+import io
 import asyncio
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -20,19 +22,38 @@ from src.core.rebuild_manager import RebuildManager
 from src.models.database import DatabaseManager
 from src.models.backup import BackupType
 from src.utils.logger import get_logger, setup_logger
-from src.utils.config import config_manager
+from src.utils.config import DEFAULT_CONFIG, get_config
+from src.utils.serializer import json_dumps
 
 # 设置日志
 setup_logger()
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时初始化，关闭时清理"""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+
 # 应用实例
 app = FastAPI(
     title="Val-Halla",
     description="QQ群成员自动备份与一键重建工具",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# 导出时每次序列化的成员数
+EXPORT_CHUNK_SIZE = 1000
+
+# 两次 OneBot 连接检查的最小间隔(秒)，仪表盘轮询时复用上次结果
+CONNECTION_CHECK_INTERVAL = 2.0
+
 # 模板目录
 TEMPLATE_DIR = Path(__file__).parent / "templates"
 STATIC_DIR = Path(__file__).parent / "static"
@@ -56,28 +77,29 @@ class AppState:
         self.config: Dict = {}
         self.connected: bool = False
         self.login_info: Dict = {}
+        self.last_connection_check: float = 0.0
 
 state = AppState()
 
 
-# ==================== 启动/关闭事件 ====================
+# ==================== 启动/关闭 ====================
 
-@app.on_event("startup")
 async def startup():
     """应用启动时初始化"""
     logger.info("Val-Halla WebUI 启动中...")
     
     # 加载配置
     try:
-        state.config = config_manager.load()
+        state.config = get_config()
     except FileNotFoundError:
-        from src.utils.config import Config
-        state.config = Config()
+        state.config = DEFAULT_CONFIG
     
-    # 初始化数据库 - 使用全局实例
-    from src.models import db_manager
-    db_manager.init_sqlite("data/database/valhalla.db")
-    db_manager.create_tables()
+    # 初始化数据库 - 使用全局实例 (通过 CLI 启动时已初始化)
+    from src.models import db_manager, init_database
+    init_tasks = []
+    if not db_manager._initialized:
+        init_database(state.config.database, create_tables=False)
+        init_tasks.append(db_manager.create_tables_async())
     state.db = db_manager
     
     # 初始化 OneBot API
@@ -86,7 +108,8 @@ async def startup():
         host=onebot_cfg.http.host,
         port=onebot_cfg.http.port,
         access_token=onebot_cfg.access_token,
-        timeout=onebot_cfg.api_timeout
+        timeout=onebot_cfg.api_timeout,
+        cache_ttl=state.config.advanced.cache.effective_ttl
     )
     
     # 初始化管理器
@@ -107,20 +130,27 @@ async def startup():
         restore_titles=rebuild_cfg.restore_titles
     )
     
-    # 尝试连接
-    await check_connection()
+    # 建表与首次连接 OneBot (同时预热 HTTP 连接) 互不依赖，并发执行
+    init_tasks.append(check_connection())
+    await asyncio.gather(*init_tasks)
     
     logger.info("Val-Halla WebUI 启动完成")
 
 
-@app.on_event("shutdown")
 async def shutdown():
     """应用关闭时清理"""
     logger.info("Val-Halla WebUI 关闭中...")
+    if state.onebot is not None:
+        await state.onebot.close()
 
 
 async def check_connection():
-    """检查 OneBot 连接状态"""
+    """检查 OneBot 连接状态 (间隔 CONNECTION_CHECK_INTERVAL 内直接复用上次结果)"""
+    now = time.monotonic()
+    if now - state.last_connection_check < CONNECTION_CHECK_INTERVAL:
+        return
+    state.last_connection_check = now
+    
     try:
         info = await state.onebot.get_login_info()
         state.connected = True
@@ -234,18 +264,16 @@ async def api_group_info(group_id: int):
         info = await state.onebot.get_group_info(group_id)
         members = await state.onebot.get_group_member_list(group_id)
         
-        # 统计角色
-        owner_count = sum(1 for m in members if m.get("role") == "owner")
-        admin_count = sum(1 for m in members if m.get("role") == "admin")
-        member_count = sum(1 for m in members if m.get("role") == "member")
+        # 统计角色 (单次遍历)
+        roles = Counter(m.get("role") for m in members)
         
         return {
             "info": info,
             "members": members,
             "stats": {
-                "owner": owner_count,
-                "admin": admin_count,
-                "member": member_count,
+                "owner": roles["owner"],
+                "admin": roles["admin"],
+                "member": roles["member"],
                 "total": len(members)
             }
         }
@@ -267,7 +295,7 @@ async def api_group_members(group_id: int):
 
 
 @app.post("/api/backup")
-async def api_backup(req: BackupRequest, background_tasks: BackgroundTasks):
+async def api_backup(req: BackupRequest):
     """创建备份"""
     if not state.connected:
         raise HTTPException(status_code=503, detail="OneBot 未连接")
@@ -280,6 +308,7 @@ async def api_backup(req: BackupRequest, background_tasks: BackgroundTasks):
             req.group_id,
             backup_type=backup_type
         )
+        state.onebot.invalidate_cache(req.group_id)
         return {
             "success": True,
             "backup_id": backup.id,
@@ -353,12 +382,48 @@ async def api_rebuild(req: RebuildRequest):
             restore_admins=req.restore_admins,
             dry_run=req.dry_run
         )
+        if not req.dry_run:
+            state.onebot.invalidate_cache(target_group_id)
         return result
     except Exception as e:
         logger.error(f"重建失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _attachment_header(filename: str) -> Dict[str, str]:
+    """下载文件的 Content-Disposition 响应头"""
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def _iter_json_chunks(members: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """按 EXPORT_CHUNK_SIZE 分块输出 JSON 数组"""
+    yield b"["
+    for start in range(0, len(members), EXPORT_CHUNK_SIZE):
+        if start:
+            yield b","
+        # 去掉分块自身的方括号，拼接为同一个数组
+        yield json_dumps(members[start:start + EXPORT_CHUNK_SIZE])[1:-1]
+    yield b"]"
+
+
+def _iter_csv_chunks(members: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """按 EXPORT_CHUNK_SIZE 分块输出 CSV (带 BOM，便于 Excel 识别 UTF-8)"""
+    import csv
+    
+    yield "\ufeff".encode("utf-8")
+    if not members:
+        return
+    
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=members[0].keys())
+    writer.writeheader()
+    for start in range(0, len(members), EXPORT_CHUNK_SIZE):
+        writer.writerows(members[start:start + EXPORT_CHUNK_SIZE])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
 @app.get("/api/export/{group_id}")
 async def api_export(group_id: int, format: str = "json"):
     """导出群成员数据"""
@@ -368,36 +433,18 @@ async def api_export(group_id: int, format: str = "json"):
     try:
         members = await state.onebot.get_group_member_list(group_id)
         
+        # 分块序列化直接写入响应，不再先落盘再读取
         if format == "json":
-            import json
-            filename = f"members_{group_id}.json"
-            filepath = Path("export") / filename
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(members, f, ensure_ascii=False, indent=2)
-            
-            return FileResponse(
-                filepath,
-                filename=filename,
-                media_type="application/json"
+            return StreamingResponse(
+                _iter_json_chunks(members),
+                media_type="application/json",
+                headers=_attachment_header(f"members_{group_id}.json")
             )
         elif format == "csv":
-            import csv
-            filename = f"members_{group_id}.csv"
-            filepath = Path("export") / filename
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(filepath, "w", encoding="utf-8-sig", newline="") as f:
-                if members:
-                    writer = csv.DictWriter(f, fieldnames=members[0].keys())
-                    writer.writeheader()
-                    writer.writerows(members)
-            
-            return FileResponse(
-                filepath,
-                filename=filename,
-                media_type="text/csv"
+            return StreamingResponse(
+                _iter_csv_chunks(members),
+                media_type="text/csv",
+                headers=_attachment_header(f"members_{group_id}.csv")
             )
         else:
             raise HTTPException(status_code=400, detail="不支持的格式")